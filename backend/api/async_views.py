@@ -0,0 +1,376 @@
+import asyncio
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from api.conditional import get_validator_headers, set_validator_headers
+from api.serializers import ShortRecipeSerializer
+from api.sparse import FIELDS_PARAM
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from foodgram.db.counts import estimate_count
+from foodgram.pagination import EstimatedPage
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from users.models import Follow, User
+from users.serializers import UserSerializer
+from users.views import UserViewSet
+
+
+def _closing_connections(func: Callable) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return wrapper
+
+
+async def run_query(func: Callable, *args, **kwargs):
+    """Run ``func`` in a worker thread with its own database connection.
+
+    Concurrent calls use separate connections, each closed (or returned to
+    the pool) when its call ends.
+    """
+    return await sync_to_async(_closing_connections(func),
+                               thread_sensitive=False)(*args, **kwargs)
+
+
+def fetch_ids(queryset) -> set:
+    return set(queryset)
+
+
+def fetch_tags(recipe_ids: List[int]) -> Dict[int, list]:
+    tags = defaultdict(list)
+    links = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).select_related('tag').order_by('tag__name')
+    for link in links:
+        tags[link.recipe_id].append(link.tag)
+    return tags
+
+
+def fetch_ingredients(recipe_ids: List[int]) -> Dict[int, list]:
+    ingredients = defaultdict(list)
+    items = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).select_related('ingredient')
+    for item in items:
+        ingredients[item.recipe_id].append(item)
+    return ingredients
+
+
+def _prefetched(queryset, objects: Iterable):
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    return queryset
+
+
+async def attach_recipe_relations(user, recipes: List[Recipe]) -> None:
+    """Load what ``RecipeSerializer`` reads, one concurrent query each."""
+    recipe_ids = [recipe.pk for recipe in recipes]
+    author_ids = {recipe.author_id for recipe in recipes}
+    (tags, ingredients, authors,
+     favorited, in_shopping_cart, followed) = await asyncio.gather(
+        run_query(fetch_tags, recipe_ids),
+        run_query(fetch_ingredients, recipe_ids),
+        run_query(User.objects.in_bulk, author_ids),
+        run_query(fetch_ids, Favorite.objects.filter(
+            owner=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)),
+        run_query(fetch_ids, ShoppingCart.objects.filter(
+            owner=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)),
+        run_query(fetch_ids, Follow.objects.filter(
+            user=user, following_id__in=author_ids
+        ).values_list('following_id', flat=True)),
+    )
+    for author in authors.values():
+        author.is_subscribed = author.pk in followed
+    for recipe in recipes:
+        recipe.author = authors[recipe.author_id]
+        recipe.is_favorited = recipe.pk in favorited
+        recipe.is_in_shopping_cart = recipe.pk in in_shopping_cart
+        recipe._prefetched_objects_cache = {
+            'tags': _prefetched(Tag.objects.all(), tags[recipe.pk]),
+            'recipe_ingredient': _prefetched(RecipeIngredient.objects.all(),
+                                             ingredients[recipe.pk]),
+        }
+
+
+class AsyncViewSetView:
+    """Serve GET requests of one viewset action from an async view.
+
+    The viewset still authenticates, filters, paginates and serializes,
+    so responses match the sync view; only the queries run differently.
+    ``falls_back`` picks the cases left to the sync view before the
+    request is throttled, so it is charged once; ``respond`` may still
+    return None for those it can only tell from its queries, and the
+    sync view then skips the throttles. The sync view also handles
+    every other method.
+    """
+    viewset_class: type
+    basename: str
+    detail: bool = False
+    actions: Dict[str, str]
+
+    @classmethod
+    def as_view(cls):
+        sync_view = cls.viewset_class.as_view(
+            cls.actions, basename=cls.basename, detail=cls.detail
+        )
+
+        async def view(request, *args, **kwargs):
+            if request.method == 'GET':
+                response = await cls().dispatch(request, kwargs)
+                if response is not None:
+                    return response
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, kwargs):
+        viewset = self.viewset_class(
+            basename=self.basename, detail=self.detail,
+            action_map={'get': self.actions['get']},
+        )
+        try:
+            drf_request = await run_query(self.initialize, viewset,
+                                          request, kwargs)
+            if drf_request is None:
+                return None
+            response = await self.respond(viewset, drf_request)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        if response is None:
+            viewset.release_heavy_slot()
+            request.skip_throttles = True
+            return None
+        return viewset.finalize_response(viewset.request, response)
+
+    def initialize(self, viewset, request, kwargs):
+        """Run the checks of the viewset; None if it falls back."""
+        viewset.args, viewset.kwargs = (), kwargs
+        viewset.request = viewset.initialize_request(request, **kwargs)
+        viewset.headers = viewset.default_response_headers
+        viewset.format_kwarg = viewset.get_format_suffix(**kwargs)
+        if self.falls_back(viewset, viewset.request):
+            return None
+        viewset.initial(viewset.request, **kwargs)
+        return viewset.request
+
+    def falls_back(self, viewset, request) -> bool:
+        return False
+
+    async def respond(self, viewset, request) -> Optional[Response]:
+        raise NotImplementedError
+
+    @staticmethod
+    def get_page(viewset, request) -> Optional[EstimatedPage]:
+        """An empty page with the requested number and size.
+
+        None when the number is not a positive integer, such as ``last``.
+        """
+        number = request.query_params.get(
+            viewset.paginator.page_query_param, '1'
+        )
+        if not number.isdigit() or int(number) < 1:
+            return None
+        paginator = viewset.paginator.django_paginator_class(
+            (), viewset.paginator.get_page_size(request)
+        )
+        return EstimatedPage([], int(number), paginator)
+
+    @staticmethod
+    def fill_page(page: EstimatedPage, objects: list,
+                  count: Tuple[int, bool]) -> bool:
+        """Put the objects into the page; False if it is out of range.
+
+        ``objects`` is the result of ``get_page_slice``, ``count`` that
+        of ``estimate_count``. Only an exact count puts a page out of
+        range, as rows may follow an estimated one.
+        """
+        paginator = page.paginator
+        paginator.count, paginator.count_is_approximate = count
+        page.object_list = objects[:paginator.per_page]
+        page.has_more = len(objects) > paginator.per_page
+        return (paginator.count_is_approximate
+                or page.number <= paginator.num_pages)
+
+    @staticmethod
+    def get_page_slice(queryset, page: EstimatedPage):
+        """The rows of the page and the first one of the next page."""
+        offset = (page.number - 1) * page.paginator.per_page
+        return queryset[offset:offset + page.paginator.per_page + 1]
+
+    @staticmethod
+    def get_paginated_response(viewset, request, page: EstimatedPage, data):
+        viewset.paginator.request = request
+        viewset.paginator.page = page
+        return viewset.paginator.get_paginated_response(data)
+
+
+class ConditionalRecipeView(AsyncViewSetView):
+    """Recipe reads of signed-in users; anonymous ones use the cache."""
+    viewset_class = RecipeViewSet
+    basename = 'recipes'
+
+    def not_modified(self, request, validators):
+        etag, timestamp = get_validator_headers(request, validators)
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=timestamp)
+        return etag, timestamp, response
+
+
+class RecipeListView(ConditionalRecipeView):
+    actions = {'get': 'list', 'post': 'create'}
+
+    def falls_back(self, viewset, request):
+        return (request.user.is_anonymous
+                or self.get_page(viewset, request) is None)
+
+    async def respond(self, viewset, request):
+        page = self.get_page(viewset, request)
+        queryset = await run_query(viewset.filter_queryset,
+                                   viewset.queryset.all())
+        recipes, count, validators = await asyncio.gather(
+            run_query(list, self.get_page_slice(queryset, page)),
+            run_query(estimate_count, queryset),
+            run_query(viewset.get_validators),
+        )
+        if not self.fill_page(page, recipes, count):
+            return None
+        recipes = page.object_list
+        etag, timestamp, response = self.not_modified(request, validators)
+        if response is None:
+            await attach_recipe_relations(request.user, recipes)
+            response = self.get_paginated_response(
+                viewset, request, page,
+                viewset.get_serializer(recipes, many=True).data,
+            )
+        return set_validator_headers(response, etag, timestamp)
+
+
+class RecipeDetailView(ConditionalRecipeView):
+    detail = True
+    actions = {'get': 'retrieve', 'put': 'update',
+               'patch': 'partial_update', 'delete': 'destroy'}
+
+    def falls_back(self, viewset, request):
+        return request.user.is_anonymous
+
+    async def respond(self, viewset, request):
+        recipe, validators = await asyncio.gather(
+            run_query(viewset.queryset.filter(
+                pk=viewset.kwargs['recipe_id']
+            ).first),
+            run_query(viewset.get_validators),
+        )
+        if recipe is None:
+            raise Http404
+        etag, timestamp, response = self.not_modified(request, validators)
+        if response is None:
+            await attach_recipe_relations(request.user, [recipe])
+            response = Response(viewset.get_serializer(recipe).data)
+        return set_validator_headers(response, etag, timestamp)
+
+
+class SubscriptionsView(AsyncViewSetView):
+    """Followed authors with their latest recipes and recipe counts."""
+    viewset_class = UserViewSet
+    basename = 'users'
+    actions = {'get': 'subscriptions'}
+
+    def falls_back(self, viewset, request):
+        return (FIELDS_PARAM in request.query_params
+                or self.get_page(viewset, request) is None)
+
+    async def respond(self, viewset, request):
+        page = self.get_page(viewset, request)
+        queryset = await run_query(
+            viewset.filter_queryset,
+            viewset.queryset.filter(following__user=request.user),
+        )
+        authors, count = await asyncio.gather(
+            run_query(list, self.get_page_slice(queryset, page)),
+            run_query(estimate_count, queryset),
+        )
+        if not self.fill_page(page, authors, count):
+            return None
+        authors = page.object_list
+        limit = request.query_params.get('recipes_limit', '')
+        limit = (min(int(limit), settings.RECIPE_LIMIT_SUBSCRIBE)
+                 if limit.isdigit() and int(limit) > settings.ZERO else None)
+        recipes = Recipe.objects.filter(author__in=authors)
+        if limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:limit]))
+        recipes_count, recipes = await asyncio.gather(
+            run_query(dict, Recipe.objects.filter(
+                author__in=authors
+            ).order_by().values_list('author').annotate(Count('pk'))),
+            run_query(list, recipes),
+        )
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        context = viewset.get_serializer_context()
+        data = []
+        for author in authors:
+            author.is_subscribed = True
+            item = UserSerializer(author, context=context).data
+            item['recipes'] = ShortRecipeSerializer(
+                recipes_by_author[author.pk], many=True
+            ).data
+            item['recipes_count'] = recipes_count.get(author.pk, 0)
+            data.append(item)
+        return self.get_paginated_response(viewset, request, page, data)
+
+
+class ThreadedViewSetView(AsyncViewSetView):
+    """A read-only viewset run whole in a worker thread.
+
+    Its single query has nothing to run concurrently with, but the event
+    loop stays free while it runs.
+    """
+
+    @classmethod
+    def as_view(cls):
+        sync_view = cls.viewset_class.as_view(
+            cls.actions, basename=cls.basename, detail=cls.detail
+        )
+
+        async def view(request, *args, **kwargs):
+            return await run_query(sync_view, request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+
+class IngredientListView(ThreadedViewSetView):
+    viewset_class = IngredientViewSet
+    basename = 'ingredients'
+    actions = {'get': 'list'}
+
+
+class TagListView(ThreadedViewSetView):
+    viewset_class = TagViewSet
+    basename = 'tags'
+    actions = {'get': 'list'}
+
+
+recipe_list = RecipeListView.as_view()
+recipe_detail = RecipeDetailView.as_view()
+subscriptions = SubscriptionsView.as_view()
+ingredient_list = IngredientListView.as_view()
+tag_list = TagListView.as_view()
@@ -0,0 +1,49 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_PREFIX = 'auth-token'
+
+
+def get_token_cache_key(key: str) -> str:
+    return f'{TOKEN_CACHE_PREFIX}:{sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_token(key: str) -> None:
+    cache.delete(get_token_cache_key(key))
+
+
+def invalidate_user_tokens(user) -> None:
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication keeping token -> user snapshots in the cache.
+
+    Entries live for ``TOKEN_CACHE_TIMEOUT`` seconds and are dropped
+    when the token is deleted or the user is saved, see ``api.signals``.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return token.user, token
@@ -0,0 +1,155 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.middleware import SAFE_METHODS, get_primary_pin_key
+from foodgram.routers import choose_replica, read_database
+
+# The synchronous views of the API, also under ASGI.
+BATCH_URLCONF = 'foodgram.urls'
+BATCH_PREFIX = '/api/'
+BATCH_URL_NAME = 'batch'
+BATCH_RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'Location', 'Retry-After')
+# The only headers an operation may set; the client's address, host and
+# credentials are always those of the batch.
+BATCH_REQUEST_HEADERS = frozenset(
+    ('accept', 'accept-language', 'if-none-match', 'prefer')
+)
+
+
+def _error(status_code: int, detail: str) -> dict:
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def build_request(request, operation: dict) -> WSGIRequest:
+    """A request for one operation, authenticated as the batch was.
+
+    It keeps the client's ``META``, but not its conditional headers, and
+    sends the ``body`` of the operation as JSON. Of the operation's
+    ``headers``, only ``BATCH_REQUEST_HEADERS`` are used.
+    """
+    url = urlsplit(operation['path'])
+    body = (b'' if operation.get('body') is None
+            else json.dumps(operation['body']).encode())
+    environ = {
+        name: value for name, value in request.META.items()
+        if not name.startswith('HTTP_IF_') and name != 'HTTP_AUTHORIZATION'
+    }
+    environ.update({
+        'REQUEST_METHOD': operation['method'],
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    })
+    for name, value in operation.get('headers', {}).items():
+        if name.lower() in BATCH_REQUEST_HEADERS:
+            environ[f'HTTP_{name.upper().replace("-", "_")}'] = value
+    sub_request = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def run_operation(request, operation: dict) -> dict:
+    """Dispatch one operation to its API view and describe the response.
+
+    Only the views of the API answering with data, not files, can be
+    batched.
+    """
+    path = urlsplit(operation['path']).path
+    try:
+        match = resolve(path, urlconf=BATCH_URLCONF)
+    except Resolver404:
+        match = None
+    if (match is None or not path.startswith(BATCH_PREFIX)
+            or match.url_name == BATCH_URL_NAME):
+        return _error(status.HTTP_404_NOT_FOUND, 'Not found.')
+    response = match.func(build_request(request, operation),
+                          *match.args, **match.kwargs)
+    if not isinstance(response, Response):
+        response.close()
+        return _error(status.HTTP_406_NOT_ACCEPTABLE,
+                      'Only JSON responses can be batched.')
+    return {
+        'status': response.status_code,
+        'headers': {name: response[name] for name in BATCH_RESPONSE_HEADERS
+                    if response.has_header(name)},
+        'body': response.data,
+    }
+
+
+def _read(request, operation: dict, replica: Optional[str]) -> dict:
+    read_database.set(replica)
+    return run_operation(request, operation)
+
+
+def _read_in_thread(request, operation: dict,
+                    replica: Optional[str]) -> dict:
+    try:
+        return _read(request, operation, replica)
+    finally:
+        connections.close_all()
+
+
+def _groups(operations: List[dict]) -> Iterator[List[dict]]:
+    """Runs of reads, and writes one at a time, in the order given."""
+    reads = []
+    for operation in operations:
+        if operation['method'] in SAFE_METHODS:
+            reads.append(operation)
+            continue
+        if reads:
+            yield reads
+            reads = []
+        yield [operation]
+    if reads:
+        yield reads
+
+
+def run_batch(request, operations: List[dict]) -> List[dict]:
+    """Run the operations of a batch, returning their responses in order.
+
+    Writes run one after another in this thread. The reads between them
+    are independent, so up to ``BATCH_WORKERS`` of them run at once,
+    each thread with its own database connections. Like
+    ``ReplicaRoutingMiddleware``, reads go to one replica unless the
+    client or an earlier operation of the batch has just written.
+    """
+    replica = None
+    if (settings.DATABASE_REPLICAS
+            and not cache.get(get_primary_pin_key(request))):
+        replica = choose_replica()
+    responses = []
+    with ThreadPoolExecutor(settings.BATCH_WORKERS) as executor:
+        for group in _groups(operations):
+            if group[0]['method'] not in SAFE_METHODS:
+                responses.append(run_operation(request, group[0]))
+                replica = None
+                continue
+            if len(group) == 1:
+                responses.append(contextvars.copy_context().run(
+                    _read, request, group[0], replica
+                ))
+                continue
+            futures = [
+                executor.submit(contextvars.copy_context().run,
+                                _read_in_thread, request, operation, replica)
+                for operation in group
+            ]
+            responses += [future.result() for future in futures]
+    return responses
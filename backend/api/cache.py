@@ -0,0 +1,112 @@
+import time
+from hashlib import sha256
+from typing import Set
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from foodgram.cache import (INGREDIENTS_TAG, RECIPE_LIST_TAG,
+                            add_missing_versions, author_tag, get_tag_versions,
+                            recipe_tag, tag_tag)
+from foodgram.routers import reading_from
+
+RESPONSE_CACHE_PREFIX = 'response'
+
+
+def get_response_tags(data) -> Set[str]:
+    """Tags of the recipes, authors and tags a recipe response shows.
+
+    Authors and tags collapsed to ids by ``?fields=`` are not shown, so
+    their changes leave the response as it is.
+    """
+    recipes = data['results'] if 'results' in data else (data,)
+    tags = {INGREDIENTS_TAG}
+    for recipe in recipes:
+        tags.add(recipe_tag(recipe['id']))
+        if isinstance(recipe.get('author'), dict):
+            tags.add(author_tag(recipe['author']['id']))
+        tags.update(tag_tag(tag['id']) for tag in recipe.get('tags', ())
+                    if isinstance(tag, dict))
+    return tags
+
+
+class CachedResponseMixin:
+    """Cache anonymous ``list`` and ``retrieve`` responses.
+
+    Entries are keyed by the URL with a normalized query string and keep
+    the versions of the tags from ``get_response_tags``; an entry whose
+    tags were invalidated since is stale. Lists are also tagged with
+    ``RECIPE_LIST_TAG``, invalidated whenever recipes join or leave
+    lists. Only one request recomputes a missing entry, the others wait
+    for it for up to ``RESPONSE_CACHE_LOCK_TIMEOUT`` seconds. Entries
+    are recomputed from the primary, as a lagging replica may not have
+    the write that invalidated them yet. A response is not stored when
+    one of its tags was invalidated while it was built, as it may show
+    the data from before that change.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request,
+                                    *args, **kwargs)
+
+    def get_response_cache_key(self, request) -> str:
+        query = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values if value != ''
+        )
+        url = f'{request.build_absolute_uri(request.path)}?{query}'
+        return (f'{RESPONSE_CACHE_PREFIX}:{self.basename}:'
+                f'{sha256(url.encode()).hexdigest()}')
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+        while True:
+            data = self._get_fresh(key)
+            if data is not None:
+                return Response(data)
+            if cache.add(lock_key, True, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return handler(request, *args, **kwargs)
+            time.sleep(settings.RESPONSE_CACHE_LOCK_POLL)
+        try:
+            started = time.time()
+            with reading_from(None):
+                response = handler(request, *args, **kwargs)
+            return self._store(key, response, started)
+        finally:
+            cache.delete(lock_key)
+
+    def _get_fresh(self, key: str):
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        versions, data = entry
+        if get_tag_versions(versions) != versions:
+            return None
+        return data
+
+    def _store(self, key: str, response: Response,
+               started: float) -> Response:
+        if response.status_code != 200:
+            return response
+        tags = get_response_tags(response.data)
+        if self.action == 'list':
+            tags.add(RECIPE_LIST_TAG)
+        versions = get_tag_versions(tags)
+        if any(version and version[0] >= started
+               for version in versions.values()):
+            return response
+        add_missing_versions(versions)
+        cache.set(key, (versions, response.data),
+                  settings.RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow, User
+
+Validators = Tuple[tuple, Optional[datetime]]
+
+
+def _count_and_last(queryset, owner_field: str, last_field: str) -> tuple:
+    grouped = queryset.filter(
+        **{owner_field: OuterRef('pk')}
+    ).order_by().values(owner_field)
+    return (
+        Subquery(grouped.annotate(value=Count('pk')).values('value')),
+        Subquery(grouped.annotate(value=Max(last_field)).values('value')),
+    )
+
+
+def get_viewer_version(user) -> tuple:
+    """Version of the viewer's favorites, shopping cart and follows.
+
+    Counts and the latest rows of each relation are read in one query, so
+    adding or removing any of them changes the version.
+    """
+    if not user.is_authenticated:
+        return ()
+    favorites, last_favorite = _count_and_last(
+        Favorite.objects.all(), 'owner', 'pub_date')
+    carts, last_cart = _count_and_last(
+        ShoppingCart.objects.all(), 'owner', 'pub_date')
+    follows, last_follow = _count_and_last(
+        Follow.objects.all(), 'user', 'pk')
+    return User.objects.filter(pk=user.pk).values_list(
+        favorites, last_favorite, carts, last_cart, follows, last_follow,
+    ).get()
+
+
+class ConditionalGetMixin:
+    """Answer ``list`` and ``retrieve`` with 304 when nothing has changed.
+
+    ``get_validators`` returns the version of what the response would
+    contain and, for anonymous responses, its last modification time.
+    The ETag is a hash of that version, so an unchanged request is
+    answered without building the response.
+    """
+
+    def get_validators(self) -> Optional[Validators]:
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, timestamp = get_validator_headers(request, validators)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        ) or handler(request, *args, **kwargs)
+        return set_validator_headers(response, etag, timestamp)
+
+
+def get_validator_headers(request,
+                          validators: Validators) -> Tuple[str, Optional[int]]:
+    """ETag and, for anonymous requests, Last-Modified timestamp."""
+    version, last_modified = validators
+    etag = quote_etag(hashlib.md5(repr(version).encode()).hexdigest())
+    timestamp = (int(last_modified.timestamp())
+                 if last_modified and request.user.is_anonymous else None)
+    return etag, timestamp
+
+
+def set_validator_headers(response, etag: str, timestamp: Optional[int]):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -1,8 +1,166 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date, time
+from typing import Optional, Tuple
+
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.pagination import EstimatedCountPaginator
+from users.filters import SEARCH_RANK
 
 
 class PaginationLimit(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = settings.DEFAULT_PAGE_PAGINATION
     max_page_size = settings.MAX_PAGE_PAGINATION
+
+
+class ApproximateCountPagination(PaginationLimit):
+    """``PaginationLimit`` whose ``count`` is estimated for large lists.
+
+    ``count_is_approximate`` in the response tells whether it is.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('count', self.page.paginator.count),
+            ('count_is_approximate',
+             self.page.paginator.count_is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_is_approximate'] = {
+            'type': 'boolean',
+        }
+        return response_schema
+
+
+def _isoformat(value):
+    """Keep the microseconds of dates, which ``DjangoJSONEncoder`` drops."""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable.')
+
+
+class KeysetPagination(BasePagination):
+    """Pages after the last row seen instead of at an offset.
+
+    The queryset is ordered by the ``ordering`` fields, the last of which
+    must be unique. ``next`` carries their values in the last row as an
+    opaque ``cursor``, and the next page starts after it. There is no
+    ``count``. When an index matches the fields in order and direction,
+    as for ``OwnedRecipePagination``, a deep page costs as little as the
+    first one; orderings on computed values, such as the rank of
+    ``UserSearchPagination``, sort every match for each page.
+    """
+    ordering: Tuple[str, ...] = ('pk',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = settings.DEFAULT_PAGE_PAGINATION
+    max_page_size = settings.MAX_PAGE_PAGINATION
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        page = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = [getattr(page[-1], field.lstrip('-'))
+                                  for field in self.ordering]
+        return page
+
+    def get_page_size(self, request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True, cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def after(self, position: list) -> Q:
+        """Rows after ``position`` in the ordering."""
+        fields = [field.lstrip('-') for field in self.ordering]
+        query = Q()
+        for number, field in enumerate(self.ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            earlier = dict(zip(fields[:number], position))
+            query |= Q(**earlier,
+                       **{f'{fields[number]}__{lookup}': position[number]})
+        return query
+
+    def decode_cursor(self, request) -> Optional[list]:
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or any(isinstance(value, (dict, list))
+                       for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        cursor = urlsafe_b64encode(
+            json.dumps(self.next_position, default=_isoformat).encode()
+        ).decode()
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('results', data),
+        )))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True,
+                         'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class UserSearchPagination(KeysetPagination):
+    """Search results by rank, see ``users.filters.UserFilter``.
+
+    No index serves the rank, so each page costs as much as the number
+    of matches; the cursor only spares the offset and the count.
+    """
+    ordering = (SEARCH_RANK, 'username')
+
+
+class OwnedRecipePagination(KeysetPagination):
+    """Favorites and shopping carts, the latest added first."""
+    ordering = ('-pub_date', 'recipe_id')
@@ -0,0 +1,37 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                  if orjson is not None else 0)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` output, encoded by orjson when it is installed.
+
+    Types orjson does not know, and datetimes, which DRF formats its own
+    way, go to the DRF encoder. Indented or ASCII-only output, and values
+    orjson rejects, such as integers wider than 64 bits, are rendered by
+    ``JSONRenderer``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None
+                or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {})):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(data, default=self.encoder_class().default,
+                                   option=ORJSON_OPTIONS)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # JSONRenderer escapes these, so the output can be embedded in JS.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
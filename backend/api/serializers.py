@@ -1,15 +1,53 @@
+from functools import partial
+from typing import Optional
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
-from drf_extra_fields.fields import Base64ImageField
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
+from api.sparse import SparseFieldsMixin
+from jobs.models import Job
+from recipes.images import schedule_image_variants
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.storage import recipe_image_storage
 from users.serializers import UserSerializer
 
 User = get_user_model()
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized recipe images: ``{size: {format: url}}``."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_variants')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for size, formats in value.items():
+            variants[size] = {}
+            for image_format, name in formats.items():
+                url = recipe_image_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][image_format] = url
+        return variants
+
+
+class RecipeImageField(Base64ImageField):
+    """An image sent as a base64 string or as a multipart file."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return super(Base64FieldMixin, self).to_internal_value(data)
+        return super().to_internal_value(data)
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -47,7 +85,16 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    collapsed_fields = {
+        'author': partial(serializers.PrimaryKeyRelatedField, read_only=True),
+        'tags': partial(serializers.PrimaryKeyRelatedField, many=True,
+                        read_only=True),
+        'ingredients': partial(serializers.SlugRelatedField,
+                               source='recipe_ingredient',
+                               slug_field='ingredient_id', many=True,
+                               read_only=True),
+    }
     tags = TagSerializer(many=True)
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(source='recipe_ingredient',
@@ -56,6 +103,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         method_name='get_is_favorited')
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='get_is_in_shopping_cart')
+    images = ImageVariantsField()
     cooking_time = serializers.IntegerField(
         min_value=settings.MIN_VALUE,
         max_value=settings.MAX_VALUE
@@ -72,6 +120,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
@@ -97,7 +146,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all(),
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -128,6 +177,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self._create_data(ingredients, recipe)
+        schedule_image_variants(recipe)
         return recipe
 
     @transaction.atomic
@@ -138,7 +188,12 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             RecipeIngredient.objects.filter(recipe=instance).delete()
             ingredients_data = validated_data.pop('ingredients')
             self._create_data(ingredients_data, instance)
-        return super().update(instance, validated_data)
+        if 'image' in validated_data:
+            validated_data['image_variants'] = {}
+        instance = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_image_variants(instance)
+        return instance
 
     @staticmethod
     def _create_data(ingredients, recipe):
@@ -160,10 +215,59 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return RecipeSerializer(self.instance, context=self.context).data
 
 
+class RecipeChangesQuerySerializer(serializers.Serializer):
+    since = serializers.RegexField(r'^[0-9]{1,18}(\.[0-9]{1,18})?$',
+                                   default='0')
+    limit = serializers.IntegerField(
+        min_value=settings.MIN_VALUE,
+        max_value=settings.RECIPE_CHANGES_MAX_PAGE_SIZE,
+        default=settings.RECIPE_CHANGES_PAGE_SIZE,
+    )
+
+
+class RecipeImportQuerySerializer(serializers.Serializer):
+    after = serializers.IntegerField(min_value=0, default=0)
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    path = serializers.RegexField(r'^/api/', max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(),
+                                    required=False)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = BatchOperationSerializer(
+        many=True, allow_empty=False,
+        max_length=settings.BATCH_MAX_OPERATIONS,
+    )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'status', 'attempts', 'progress',
+                  'created_at', 'finished_at', 'error', 'result_url')
+
+    def get_result_url(self, job: Job) -> Optional[str]:
+        """Where to download the file the job made, once it is done."""
+        if job.status != Job.DONE or not (job.result or {}).get('file'):
+            return None
+        return reverse('api:jobs-result', kwargs={'job_id': job.pk},
+                       request=self.context.get('request'))
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class SubscribeSerializer(UserSerializer):
@@ -0,0 +1,84 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token, invalidate_user_tokens
+from foodgram.cache import (INGREDIENTS_TAG, RECIPE_LIST_TAG, author_tag,
+                            invalidate_tags, recipe_tag, tag_tag)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+LOGIN_FIELDS = frozenset(('last_login',))
+
+
+def invalidate_on_commit(*tags: str) -> None:
+    transaction.on_commit(partial(invalidate_tags, tags))
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_user_tokens(sender, instance, **kwargs):
+    invalidate_user_tokens(instance)
+
+
+@receiver(post_save, sender=User)
+def drop_author_responses(sender, instance, created, update_fields=None,
+                          **kwargs):
+    if created or update_fields and LOGIN_FIELDS.issuperset(update_fields):
+        return
+    invalidate_on_commit(author_tag(instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def drop_saved_recipe_responses(sender, instance, created, **kwargs):
+    if created:
+        invalidate_on_commit(recipe_tag(instance.pk), RECIPE_LIST_TAG)
+    else:
+        invalidate_on_commit(recipe_tag(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_deleted_recipe_responses(sender, instance, **kwargs):
+    invalidate_on_commit(recipe_tag(instance.pk), RECIPE_LIST_TAG)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def drop_recipe_ingredient_responses(sender, instance, **kwargs):
+    invalidate_on_commit(recipe_tag(instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def drop_recipe_tag_responses(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_on_commit(recipe_tag(instance.pk), RECIPE_LIST_TAG)
+    elif action == 'pre_clear':
+        invalidate_on_commit(tag_tag(instance.pk), RECIPE_LIST_TAG)
+    else:
+        invalidate_on_commit(tag_tag(instance.pk), RECIPE_LIST_TAG,
+                             *map(recipe_tag, pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def drop_tag_responses(sender, instance, **kwargs):
+    invalidate_on_commit(tag_tag(instance.pk), RECIPE_LIST_TAG)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def drop_ingredient_responses(sender, instance, **kwargs):
+    invalidate_on_commit(INGREDIENTS_TAG)
@@ -0,0 +1,77 @@
+from typing import Callable, Dict, FrozenSet, Iterable, Optional
+
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_names(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(',')
+                     if name.strip())
+
+
+class SparseFieldsMixin:
+    """Serialize only the requested ``fields``, ``id`` always included.
+
+    With ``fields`` given, the relations in ``collapsed_fields`` show as
+    ids unless they are also in ``expand``; without it the serializer is
+    unchanged. Unknown field names fail validation.
+    """
+    collapsed_fields: Dict[str, Callable[[], serializers.Field]] = {}
+
+    def __init__(self, *args, fields: Optional[Iterable[str]] = None,
+                 expand: Iterable[str] = (), **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        unknown = (set(fields) | set(expand)) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({
+                FIELDS_PARAM: f'Unknown fields: {", ".join(sorted(unknown))}.'
+            })
+        for name in set(self.fields) - set(fields) - {'id'}:
+            self.fields.pop(name)
+        for name, make_field in self.collapsed_fields.items():
+            if name in self.fields and name not in expand:
+                self.fields[name] = make_field()
+
+
+class SparseFieldsViewMixin:
+    """Pass ``?fields=`` and ``?expand=`` to the serializer.
+
+    They apply to the ``sparse_actions``; ``wants_field`` and
+    ``expands_field`` let ``get_queryset`` skip the prefetches and
+    annotations of fields left out of the response.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_requested_fields(self) -> Optional[FrozenSet[str]]:
+        if self.action not in self.sparse_actions:
+            return None
+        return parse_field_names(
+            self.request.query_params.get(FIELDS_PARAM)
+        )
+
+    def get_expanded_fields(self) -> FrozenSet[str]:
+        return parse_field_names(
+            self.request.query_params.get(EXPAND_PARAM)
+        ) or frozenset()
+
+    def wants_field(self, name: str) -> bool:
+        fields = self.get_requested_fields()
+        return fields is None or name in fields
+
+    def expands_field(self, name: str) -> bool:
+        fields = self.get_requested_fields()
+        return fields is None or (name in fields
+                                  and name in self.get_expanded_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None and kwargs.get('data') is None:
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', self.get_expanded_fields())
+        return super().get_serializer(*args, **kwargs)
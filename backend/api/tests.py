@@ -0,0 +1,1003 @@
+import base64
+import csv
+import gzip
+import json
+import tempfile
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.db import connection
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.batch import build_request
+from api.renderers import ORJSONRenderer
+from api.throttling import (AnonTokenBucketThrottle, UserTokenBucketThrottle,
+                            acquire_heavy_slot)
+from api.uploads import (LimitedMultiPartParser,
+                         LimitedTemporaryFileUploadHandler)
+from foodgram.db.pool import ConnectionPool, PoolTimeoutError, get_pool
+from foodgram.middleware import ReplicaRoutingMiddleware
+from foodgram.routers import PrimaryReplicaRouter, read_database
+from jobs.models import Job
+from recipes.exports import export_record, iter_recipes
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeChange,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import Follow, User
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cook', email='cook@mail.ru', password='old-password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_token_lookup_is_cached(self):
+        self.client.get('/api/users/me/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(Token._meta.db_table in query['sql']
+                             for query in queries))
+
+    def test_logout_invalidates_token(self):
+        self.client.get('/api/users/me/')
+        self.client.post('/api/auth/token/logout/')
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_invalidates_token(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_password_change_refreshes_snapshot(self):
+        self.client.get('/api/users/me/')
+        self.client.post('/api/users/set_password/', {
+            'new_password': 'new-secret-password',
+            'current_password': 'old-password',
+        })
+        response = self.client.post('/api/users/set_password/', {
+            'new_password': 'another-secret-password',
+            'current_password': 'new-secret-password',
+        })
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeMultipartUploadTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.tag = Tag.objects.create(name='Lunch', color='#49B64E',
+                                      slug='lunch')
+        self.salt = Ingredient.objects.create(name='salt',
+                                              measurement_unit='g')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'JPEG')
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                                  content_type='image/jpeg')
+
+    def test_create_recipe_with_multipart_image(self):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Salad',
+            'text': 'Mix',
+            'cooking_time': 5,
+            'tags': [self.tag.pk],
+            'ingredients[0]id': self.salt.pk,
+            'ingredients[0]amount': 10,
+            'image': self._image(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get()
+        self.assertTrue(recipe.image.name.endswith('.jpg'))
+        self.assertEqual(recipe.recipe_ingredient.get().amount, 10)
+
+    @override_settings(UPLOAD_MAX_SIZE=100)
+    def test_oversized_upload_is_rejected(self):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Salad', 'image': self._image(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 413)
+
+    @override_settings(UPLOAD_MAX_SIZE=1000)
+    def test_undeclared_oversized_upload_is_rejected(self):
+        def parse(parser, stream, media_type=None, parser_context=None):
+            # As a chunked body, only seen to be too large while read.
+            handler = LimitedTemporaryFileUploadHandler(
+                parser_context['request']._request
+            )
+            with self.assertRaises(StopUpload):
+                handler.receive_data_chunk(b'x' * 600, 600)
+            return DataAndFiles({}, {})
+
+        with mock.patch.object(MultiPartParser, 'parse', autospec=True,
+                               side_effect=parse):
+            response = self.client.post('/api/recipes/', {'name': 'Salad'},
+                                        format='multipart')
+        self.assertEqual(response.status_code, 413)
+
+    def test_malformed_content_length_is_rejected(self):
+        request = RequestFactory().post('/api/recipes/',
+                                        CONTENT_LENGTH='many')
+        with self.assertRaises(ParseError):
+            LimitedMultiPartParser().parse(
+                BytesIO(), 'multipart/form-data', {'request': request}
+            )
+
+
+class ConditionalGetTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Salad', text='Mix', cooking_time=5,
+            image='recipes/images/salad.jpg',
+        )
+        self.client = APIClient()
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get('/api/recipes/',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_is_validated_without_queries(self):
+        cache.clear()
+        etag = self.client.get('/api/recipes/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/recipes/',
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Chef'
+            self.user.save()
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_favorite_changes_viewer_etag(self):
+        self.client.force_authenticate(self.user)
+        url = f'/api/recipes/{self.recipe.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.client.post(f'{url}favorite/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+    def test_tag_changes_change_recipe_etag(self):
+        tag = Tag.objects.create(name='Lunch', color='#49B64E', slug='lunch')
+        self.recipe.tags.add(tag)
+        self.client.force_authenticate(self.user)
+        url = f'/api/recipes/{self.recipe.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.color = '#E26C2D'
+            tag.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tags'][0]['color'], '#E26C2D')
+
+
+class RecipeChangesTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.tag = Tag.objects.create(name='Lunch', color='#49B64E',
+                                      slug='lunch')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Salad', text='Mix', cooking_time=5,
+            image='recipes/images/salad.jpg',
+        )
+        self.client = APIClient()
+
+    def _sync(self, since):
+        response = self.client.get('/api/recipes/changes/',
+                                   {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_cursor(self):
+        first = self._sync(0)
+        self.assertEqual([recipe['id'] for recipe in first['results']],
+                         [self.recipe.pk])
+        self.assertEqual(self._sync(first['cursor'])['results'], [])
+
+        self.recipe.tags.add(self.tag)
+        changed = self._sync(first['cursor'])
+        self.assertEqual(changed['results'][0]['tags'][0]['slug'], 'lunch')
+
+        recipe_id = self.recipe.pk
+        self.recipe.delete()
+        deleted = self._sync(changed['cursor'])
+        self.assertEqual(deleted['results'], [])
+        self.assertEqual(deleted['deleted'], [recipe_id])
+
+    def test_changes_are_paged(self):
+        Recipe.objects.create(author=self.user, name='Soup', text='Boil',
+                              cooking_time=30)
+        page = self.client.get('/api/recipes/changes/', {'limit': 1}).data
+        self.assertTrue(page['has_more'])
+        self.assertEqual(len(page['results']), 1)
+        self.assertFalse(self._sync(page['cursor'])['has_more'])
+
+    def test_changes_follow_transaction_order(self):
+        soup = Recipe.objects.create(author=self.user, name='Soup',
+                                     text='Boil', cooking_time=30)
+        first = self._sync(0)
+        late = RecipeChange.objects.create(recipe_id=soup.pk,
+                                           transaction_id=9,
+                                           action=RecipeChange.DELETE)
+        early = RecipeChange.objects.create(recipe_id=self.recipe.pk,
+                                            transaction_id=7,
+                                            action=RecipeChange.UPSERT)
+        page = self.client.get('/api/recipes/changes/',
+                               {'since': first['cursor'], 'limit': 1}).data
+        self.assertEqual(page['cursor'], f'7.{early.pk}')
+        self.assertEqual(page['results'][0]['id'], self.recipe.pk)
+        page = self._sync(page['cursor'])
+        self.assertEqual(page['cursor'], f'9.{late.pk}')
+        self.assertEqual(page['deleted'], [soup.pk])
+        self.assertEqual(self._sync(page['cursor'])['deleted'], [])
+        response = self.client.get('/api/recipes/changes/',
+                                   {'since': '7.x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RecipeResponseCacheTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Salad', text='Mix', cooking_time=5,
+            image='recipes/images/salad.jpg',
+        )
+        self.client = APIClient()
+
+    def _names(self):
+        response = self.client.get('/api/recipes/', {'limit': 10})
+        return [recipe['name'] for recipe in response.data['results']]
+
+    def test_anonymous_list_is_cached(self):
+        self.assertEqual(self._names(), ['Salad'])
+        Recipe.objects.filter(pk=self.recipe.pk).update(name='Soup')
+        self.assertEqual(self._names(), ['Salad'])
+
+    def test_writes_invalidate_affected_entries(self):
+        self._names()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Soup'
+            self.recipe.save()
+        self.assertEqual(self._names(), ['Soup'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(author=self.user, name='Stew', text='Boil',
+                                  cooking_time=60)
+        self.assertEqual(self._names(), ['Stew', 'Soup'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Chef'
+            self.user.save()
+        response = self.client.get('/api/recipes/', {'limit': 10})
+        self.assertEqual(response.data['results'][0]['author']['first_name'],
+                         'Chef')
+
+
+class SparseFieldsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.tag = Tag.objects.create(name='Lunch', color='#49B64E',
+                                      slug='lunch')
+        self.ingredient = Ingredient.objects.create(name='Salt',
+                                                    measurement_unit='g')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Salad', text='Mix', cooking_time=5,
+            image='recipes/images/salad.jpg',
+        )
+        self.recipe.tags.add(self.tag)
+        RecipeIngredient.objects.create(recipe=self.recipe,
+                                        ingredient=self.ingredient, amount=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _list(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]
+
+    def test_fields_collapse_relations_to_ids(self):
+        recipe = self._list(fields='name,author,tags,ingredients')
+        self.assertEqual(recipe, {
+            'id': self.recipe.pk, 'name': 'Salad', 'author': self.user.pk,
+            'tags': [self.tag.pk], 'ingredients': [self.ingredient.pk],
+        })
+        recipe = self._list(fields='author,tags', expand='author,tags')
+        self.assertEqual(recipe['author']['username'], 'cook')
+        self.assertEqual(recipe['tags'][0]['slug'], 'lunch')
+
+    def test_fewer_fields_take_fewer_queries(self):
+        self._list()
+        with CaptureQueriesContext(connection) as full:
+            self._list()
+        with CaptureQueriesContext(connection) as sparse:
+            self._list(fields='name,image')
+        self.assertLess(len(sparse), len(full))
+        self.assertFalse(any('is_favorited' in query['sql']
+                             for query in sparse))
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/recipes/', {'fields': 'calories'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_fields(self):
+        response = self.client.get('/api/users/me/',
+                                   {'fields': 'username'})
+        self.assertEqual(response.data, {'id': self.user.pk,
+                                         'username': 'cook'})
+
+
+class RenderingTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        for number in range(10):
+            Recipe.objects.create(
+                author=self.user, name=f'Salad {number}', text='Mix' * 50,
+                cooking_time=5, image='recipes/images/salad.jpg',
+            )
+        self.client = APIClient()
+
+    def test_orjson_matches_json_renderer(self):
+        data = {
+            'name': 'Борщ\u2028', 'amount': Decimal('1.50'), 'ids': (1, 2),
+            'created': datetime(2023, 4, 1, 12, 30, tzinfo=timezone.utc),
+            'on': date(2023, 4, 1), 'empty': None, 7: 'seven',
+        }
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_large_responses_are_compressed(self):
+        plain = self.client.get('/api/recipes/')
+        response = self.client.get('/api/recipes/',
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_small_or_refused_responses_are_not_compressed(self):
+        response = self.client.get('/api/tags/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/api/recipes/',
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ApproximateCountTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        Recipe.objects.create(author=self.user, name='Salad', text='Mix',
+                              cooking_time=5)
+        self.client = APIClient()
+
+    def test_small_lists_are_counted_exactly(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertFalse(response.data['count_is_approximate'])
+
+    @mock.patch('foodgram.pagination.estimate_count',
+                return_value=(50000, True))
+    def test_large_lists_are_estimated(self, estimate_count):
+        response = self.client.get('/api/users/', {'page': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 50000)
+        self.assertTrue(response.data['count_is_approximate'])
+        self.assertEqual(response.data['results'], [])
+
+    def test_pages_past_a_low_estimate_are_reachable(self):
+        for name in ('Soup', 'Stew'):
+            Recipe.objects.create(author=self.user, name=name, text='Boil',
+                                  cooking_time=30)
+        for path in ('foodgram.pagination.estimate_count',
+                     'api.async_views.estimate_count'):
+            patcher = mock.patch(path, return_value=(1, True))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        token = Token.objects.create(user=self.user)
+        for credentials in ({}, {'HTTP_AUTHORIZATION': f'Token {token.key}'}):
+            self.client.credentials(**credentials)
+            response = self.client.get('/api/recipes/',
+                                       {'limit': 1, 'page': 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], 1)
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertIn('page=3', response.data['next'])
+            response = self.client.get('/api/recipes/',
+                                       {'limit': 1, 'page': 3})
+            self.assertEqual(len(response.data['results']), 1)
+            self.assertIsNone(response.data['next'])
+
+
+class RecipeExportTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='secret'
+        )
+        tag = Tag.objects.create(name='Lunch', color='#49B64E', slug='lunch')
+        salt = Ingredient.objects.create(name='Salt', measurement_unit='g')
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                author=self.admin, name=f'Salad {number}', text='Mix',
+                cooking_time=5,
+            )
+            recipe.tags.add(tag)
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                            amount=number + 1)
+        self.client = APIClient()
+
+    def _export(self, **params):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/recipes/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_staff_only(self):
+        response = self.client.get('/api/recipes/export/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_json_lines(self):
+        lines = self._export().splitlines()
+        self.assertEqual(len(lines), 5)
+        record = json.loads(lines[-1])
+        self.assertEqual(record['tags'], ['lunch'])
+        self.assertEqual(record['ingredients'][0]['amount'], 5)
+        self.assertEqual(record['author']['username'], 'admin')
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self._export(output='csv'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(json.loads(rows[0]['tags']), ['lunch'])
+
+    def test_relations_are_prefetched_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            records = [export_record(recipe)
+                       for recipe in iter_recipes(chunk_size=2)]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(len(queries), 1 + 3 * 3)
+
+
+class RecipeImportTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.tag = Tag.objects.create(name='Lunch', color='#49B64E',
+                                      slug='lunch')
+        self.salt = Ingredient.objects.create(name='salt',
+                                              measurement_unit='g')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, lines, **params):
+        return self.client.generic(
+            'POST', f'/api/recipes/import/?{urlencode(params)}',
+            '\n'.join(lines), content_type='application/x-ndjson',
+        )
+
+    def test_bundle_with_invalid_records(self):
+        recipe = {'name': 'Soup', 'text': 'Boil', 'cooking_time': 30,
+                  'tags': [self.tag.pk],
+                  'ingredients': [{'id': self.salt.pk, 'amount': 5}]}
+        lines = [
+            json.dumps(recipe),
+            '{"name": ',
+            json.dumps({**recipe, 'tags': ['dinner'], 'cooking_time': 0}),
+            json.dumps({**recipe, 'ingredients': [
+                {'id': self.salt.pk, 'amount': 1},
+                {'name': 'salt', 'measurement_unit': 'g', 'amount': 2},
+            ]}),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post(lines)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['checkpoint'], 4)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([error['line'] for error in response.data['errors']],
+                         [2, 3, 4])
+        self.assertEqual(set(response.data['errors'][1]['errors']),
+                         {'tags', 'cooking_time'})
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.author, self.user)
+        self.assertEqual(recipe.recipe_ingredient.get().amount, 5)
+        self.assertTrue(RecipeChange.objects.filter(recipe_id=recipe.pk))
+
+        response = self._post(lines, after=4)
+        self.assertEqual(response.data['created'], [])
+        self.assertEqual(Recipe.objects.count(), 1)
+
+
+class BatchTestCase(TransactionTestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.author = User.objects.create_user(username='chef',
+                                               email='chef@mail.ru')
+        self.tag = Tag.objects.create(name='Lunch', color='#49B64E',
+                                      slug='lunch')
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Soup', text='Boil', cooking_time=30,
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def _batch(self, *operations):
+        return self.client.post('/api/batch/', {'operations': [
+            {'method': method, 'path': path} for method, path in operations
+        ]}, format='json')
+
+    def test_reads_run_as_the_batch_user(self):
+        response = self._batch(
+            ('GET', f'/api/recipes/{self.recipe.pk}/?fields=id,name'),
+            ('GET', '/api/users/me/'),
+            ('GET', '/api/tags/'),
+            ('GET', f'/api/users/{self.author.pk}/'),
+            ('GET', '/api/unknown/'),
+        )
+        self.assertEqual(response.status_code, 200)
+        recipe, me, tags, author, unknown = response.data['responses']
+        self.assertEqual(recipe['body'], {'id': self.recipe.pk,
+                                          'name': 'Soup'})
+        self.assertIn('ETag', recipe['headers'])
+        self.assertEqual(me['body']['username'], 'cook')
+        self.assertEqual(tags['body'][0]['slug'], 'lunch')
+        self.assertFalse(author['body']['is_subscribed'])
+        self.assertEqual(unknown['status'], 404)
+
+    def test_writes_run_in_order(self):
+        response = self._batch(
+            ('POST', f'/api/users/{self.author.pk}/subscribe/'),
+            ('GET', f'/api/users/{self.author.pk}/'),
+            ('DELETE', f'/api/users/{self.author.pk}/subscribe/'),
+            ('GET', f'/api/users/{self.author.pk}/'),
+            ('GET', '/api/batch/'),
+        )
+        statuses = [item['status'] for item in response.data['responses']]
+        self.assertEqual(statuses, [201, 200, 204, 200, 404])
+        subscribed = [item['body']['is_subscribed']
+                      for item in response.data['responses'][1:4:2]]
+        self.assertEqual(subscribed, [True, False])
+
+    def test_limits(self):
+        response = self._batch(*[('GET', '/api/tags/')] * 21)
+        self.assertEqual(response.status_code, 400)
+        response = self._batch(('GET', '/admin/'))
+        self.assertEqual(response.status_code, 400)
+        self.client.credentials(HTTP_AUTHORIZATION='Token wrong')
+        response = self._batch(('GET', '/api/tags/'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_operations_cannot_spoof_the_client(self):
+        request = RequestFactory().post(
+            '/api/batch/', HTTP_HOST='foodgram.ru',
+            HTTP_X_FORWARDED_FOR='10.0.0.1', REMOTE_ADDR='10.0.0.2',
+        )
+        request.user = self.user
+        request.auth = None
+        sub_request = build_request(request, {
+            'method': 'GET', 'path': '/api/tags/', 'headers': {
+                'X-Forwarded-For': '10.0.0.3', 'Host': 'evil.ru',
+                'Authorization': 'Token wrong', 'Remote-Addr': '10.0.0.4',
+                'accept-language': 'en', 'Prefer': 'respond-async',
+            },
+        })
+        self.assertEqual(sub_request.META['HTTP_X_FORWARDED_FOR'],
+                         '10.0.0.1')
+        self.assertEqual(sub_request.META['REMOTE_ADDR'], '10.0.0.2')
+        self.assertEqual(sub_request.get_host(), 'foodgram.ru')
+        self.assertNotIn('HTTP_AUTHORIZATION', sub_request.META)
+        self.assertNotIn('HTTP_REMOTE_ADDR', sub_request.META)
+        self.assertEqual(sub_request.META['HTTP_ACCEPT_LANGUAGE'], 'en')
+        self.assertEqual(sub_request.META['HTTP_PREFER'], 'respond-async')
+
+
+class ThrottlingTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch.dict(UserTokenBucketThrottle.THROTTLE_RATES,
+                     {'user': '40/min'})
+    def test_actions_take_their_weight(self):
+        url = '/api/recipes/download_shopping_cart/'
+        response = self.client.get(url, HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        response = self.client.get(url, HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 429)
+        self.assertAlmostEqual(int(response['Retry-After']), 30, delta=1)
+        statuses = [
+            self.client.get('/api/users/subscriptions/', params).status_code
+            for params in ({'limit': 100}, {}, {})
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @mock.patch.dict(AnonTokenBucketThrottle.THROTTLE_RATES,
+                     {'anon': '2/min'})
+    def test_anonymous_clients_by_address(self):
+        client = APIClient()
+        statuses = [client.get('/api/tags/').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        response = client.get('/api/tags/', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(HEAVY_REQUEST_SLOTS=1)
+    def test_heavy_actions_are_capped(self):
+        slot = acquire_heavy_slot()
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+        cache.delete(slot)
+        response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(acquire_heavy_slot())
+
+
+class UserSearchTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             email='reader@mail.ru')
+        for username, last_name in (('annabel', 'Smith'), ('ann', 'Lee'),
+                                    ('joanna', 'Brown'), ('bob', 'Annet')):
+            User.objects.create_user(username=username, last_name=last_name,
+                                     email=f'{username}@mail.ru')
+        Follow.objects.create(user=self.user,
+                              following=User.objects.get(username='joanna'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/users/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_ranked(self):
+        data = self.search(search='Ann')
+        self.assertNotIn('count', data)
+        self.assertEqual(
+            [(user['username'], user['is_subscribed'])
+             for user in data['results']],
+            [('ann', False), ('annabel', False), ('bob', False),
+             ('joanna', True)],
+        )
+
+    def test_short_terms_match_prefixes(self):
+        data = self.search(search='an')
+        self.assertEqual([user['username'] for user in data['results']],
+                         ['ann', 'annabel', 'bob'])
+
+    def test_pages_follow_the_cursor(self):
+        usernames = []
+        data = self.search(search='ann', limit=3)
+        while True:
+            usernames += [user['username'] for user in data['results']]
+            if data['next'] is None:
+                break
+            response = self.client.get(data['next'])
+            data = response.data
+        self.assertEqual(usernames, ['ann', 'annabel', 'bob', 'joanna'])
+        cursors = ['broken'] + [
+            base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            for position in (['first', 'ann'], [{}, 'ann'], [1])
+        ]
+        for cursor in cursors:
+            response = self.client.get('/api/users/',
+                                       {'search': 'ann', 'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+class OwnedRecipeListTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.recipes = [
+            Recipe.objects.create(author=self.user, name=f'Recipe {number}',
+                                  text='Mix', cooking_time=5)
+            for number in range(5)
+        ]
+        added = datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+        for number, recipe in enumerate(self.recipes):
+            Favorite.objects.create(owner=self.user, recipe=recipe)
+            Favorite.objects.filter(recipe=recipe).update(
+                pub_date=added.replace(hour=number // 2)
+            )
+        ShoppingCart.objects.create(owner=self.user, recipe=self.recipes[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_the_cursor(self):
+        self.recipes[3].is_deleted = True
+        self.recipes[3].save()
+        ids = []
+        response = self.client.get('/api/recipes/favorites/', {'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(ids, [self.recipes[number].pk
+                               for number in (4, 2, 0, 1)])
+
+    def test_cart(self):
+        response = self.client.get('/api/recipes/cart/')
+        self.assertEqual(
+            [recipe['name'] for recipe in response.data['results']],
+            ['Recipe 0'],
+        )
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursors_and_anonymous_users(self):
+        response = self.client.get('/api/recipes/favorites/',
+                                   {'cursor': 'WyJub3ciLCAxXQ=='})
+        self.assertEqual(response.status_code, 404)
+        response = APIClient().get('/api/recipes/favorites/')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(
+            lambda request: PrimaryReplicaRouter().db_for_read(Recipe)
+        )
+
+    def _read_database(self, method, token='Token first'):
+        request = getattr(self.factory, method)('/api/recipes/',
+                                                HTTP_AUTHORIZATION=token)
+        return self.middleware(request)
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self._read_database('get'), 'replica_1')
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Recipe),
+                         'default')
+
+    def test_client_reads_from_primary_after_write(self):
+        self.assertEqual(self._read_database('post'), 'default')
+        self.assertEqual(self._read_database('get'), 'default')
+        self.assertEqual(self._read_database('get', 'Token second'),
+                         'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+    def test_one_replica_serves_a_request(self):
+        router = PrimaryReplicaRouter()
+        middleware = ReplicaRoutingMiddleware(lambda request: {
+            router.db_for_read(Recipe) for _ in range(20)
+        })
+        databases = middleware(self.factory.get('/api/recipes/'))
+        self.assertEqual(len(databases), 1)
+        self.assertIn(databases.pop(), ('replica_1', 'replica_2'))
+
+    def test_cached_responses_are_built_from_primary(self):
+        Recipe.objects.create(
+            author=User.objects.create_user(username='cook',
+                                            email='cook@mail.ru'),
+            name='Salad', text='Mix', cooking_time=5,
+        )
+        targets = []
+
+        def db_for_read(router, model, **hints):
+            targets.append((model, read_database.get()))
+            return 'default'
+
+        with mock.patch.object(PrimaryReplicaRouter, 'db_for_read',
+                               autospec=True, side_effect=db_for_read):
+            response = APIClient().get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn((Recipe, None), targets)
+        self.assertNotIn((Recipe, 'replica_1'),
+                         targets[targets.index((Recipe, None)):])
+
+    def test_jobs_are_read_from_primary(self):
+        user = User.objects.create_user(username='cook',
+                                        email='cook@mail.ru')
+        job = Job.objects.create(task='recipes.shopping_cart', owner=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        targets = []
+
+        def db_for_read(router, model, **hints):
+            targets.append((model, read_database.get()))
+            return 'default'
+
+        with mock.patch.object(PrimaryReplicaRouter, 'db_for_read',
+                               autospec=True, side_effect=db_for_read):
+            response = client.get(f'/api/jobs/{job.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(targets, [(Job, None)])
+
+
+class FakeConnection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.pool = ConnectionPool(max_size=2, timeout=0.01,
+                                   health_check_after=0, max_lifetime=60)
+
+    def test_connections_are_reused_and_checked(self):
+        first = self.pool.acquire(FakeConnection, lambda conn: True)
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(FakeConnection, lambda conn: True),
+                      first)
+        self.pool.release(first)
+        second = self.pool.acquire(FakeConnection, lambda conn: False)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(self.pool.stats()['health_check_failures'], 1)
+
+    def test_pool_is_bounded(self):
+        self.pool.acquire(FakeConnection, bool)
+        connection = self.pool.acquire(FakeConnection, bool)
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.acquire(FakeConnection, bool)
+        self.pool.release(connection, reusable=False)
+        self.assertTrue(connection.closed)
+        self.pool.acquire(FakeConnection, bool)
+        stats = self.pool.stats()
+        self.assertEqual((stats['in_use'], stats['timeouts']), (2, 1))
+
+    def test_stats_are_staff_only(self):
+        get_pool('default', (), {})
+        user = User.objects.create_user(username='admin',
+                                        email='admin@mail.ru')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/db/pools/').status_code, 403)
+        user.is_staff = True
+        response = client.get('/api/db/pools/')
+        self.assertEqual(response.data['default']['max_size'], 10)
+
+
+class AsyncReadViewsTestCase(TransactionTestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             email='reader@mail.ru')
+        author = User.objects.create_user(username='cook',
+                                          email='cook@mail.ru')
+        Follow.objects.create(user=self.user, following=author)
+        tags = [Tag.objects.create(name=name, color=color, slug=name)
+                for name, color in (('lunch', '#49B64E'),
+                                    ('dinner', '#8775D2'))]
+        salt = Ingredient.objects.create(name='salt', measurement_unit='g')
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Recipe {number}', text='Mix',
+                cooking_time=5, image='recipes/images/salad.jpg',
+            )
+            recipe.tags.set(tags[:number])
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                            amount=number + 1)
+        Favorite.objects.create(owner=self.user, recipe=recipe)
+        ShoppingCart.objects.create(owner=self.user, recipe=recipe)
+        self.recipe = recipe
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get_both(self, url, params=None):
+        sync_response = self.client.get(url, params)
+        with override_settings(ROOT_URLCONF='foodgram.asgi_urls'):
+            async_response = self.client.get(url, params)
+        self.assertEqual(async_response.status_code,
+                         sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return sync_response, async_response
+
+    def test_async_views_match_sync_views(self):
+        for url, params in (
+            ('/api/recipes/', {'limit': 2}),
+            ('/api/recipes/', {'limit': 2, 'page': 2}),
+            ('/api/recipes/', {'tags': 'lunch'}),
+            (f'/api/recipes/{self.recipe.pk}/', None),
+            ('/api/users/subscriptions/', {'recipes_limit': 2}),
+            ('/api/ingredients/', {'name': 'sa'}),
+            ('/api/tags/', None),
+        ):
+            with self.subTest(url=url, params=params):
+                self._get_both(url, params)
+
+    def test_async_recipe_views_keep_validators(self):
+        sync_response, async_response = self._get_both('/api/recipes/')
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+        with override_settings(ROOT_URLCONF='foodgram.asgi_urls'):
+            response = self.client.get(
+                '/api/recipes/', HTTP_IF_NONE_MATCH=sync_response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_pages_and_recipes(self):
+        self._get_both('/api/recipes/', {'page': 5})
+        self._get_both('/api/recipes/0/')
+
+    @mock.patch.dict(UserTokenBucketThrottle.THROTTLE_RATES,
+                     {'user': '10/min', 'anon': '10/min'})
+    def test_fallbacks_are_throttled_once(self):
+        for client, url, params, weight in (
+            (self.client, '/api/recipes/', {'page': 5}, 1),
+            (self.client, '/api/recipes/', {'page': 'last'}, 1),
+            (self.client, '/api/users/subscriptions/', {'fields': 'id'}, 2),
+            (APIClient(), '/api/recipes/', None, 1),
+        ):
+            with self.subTest(url=url, params=params):
+                cache.clear()
+                with override_settings(ROOT_URLCONF='foodgram.asgi_urls'):
+                    client.get(url, params)
+                ident = (self.user.pk if client is self.client
+                         else '127.0.0.1')
+                scope = 'user' if client is self.client else 'anon'
+                tokens, _ = cache.get(f'throttle_{scope}_{ident}')
+                self.assertAlmostEqual(tokens, 10 - weight, places=1)
@@ -0,0 +1,129 @@
+import random
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import SimpleRateThrottle
+
+HEAVY_SLOT_PREFIX = 'heavy-slot'
+
+
+def get_throttle_weight(view) -> int:
+    get_weight = getattr(view, 'get_throttle_weight', None)
+    return get_weight() if get_weight else 1
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """A token bucket per client, kept in the cache.
+
+    The rate ``N/period`` of the scope is a bucket of ``N`` tokens that
+    refills at ``N`` tokens per period, so bursts of up to ``N`` are
+    allowed. A request takes as many tokens as the view's
+    ``get_throttle_weight()``; when the bucket has fewer, the client is
+    told in ``Retry-After`` when it will have enough. Like DRF's own
+    throttles, concurrent requests of one client may race and take a
+    few tokens more than the rate allows.
+    """
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        weight = min(get_throttle_weight(view), self.num_requests)
+        refill_rate = self.num_requests / self.duration
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests,
+                     tokens + (now - updated) * refill_rate)
+        if tokens < weight:
+            self.wait_time = (weight - tokens) / refill_rate
+            return False
+        self.cache.set(self.key, (tokens - weight, now), self.duration)
+        return True
+
+    def wait(self) -> Optional[float]:
+        return getattr(self, 'wait_time', None)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle authenticated users by their id."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope,
+                                    'ident': request.user.pk}
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Throttle anonymous clients by their IP address.
+
+    Behind ``NUM_PROXIES`` proxies, the address is taken from
+    ``X-Forwarded-For``.
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope,
+                                    'ident': self.get_ident(request)}
+
+
+def acquire_heavy_slot() -> Optional[str]:
+    """Take one of the ``HEAVY_REQUEST_SLOTS`` shared by all workers.
+
+    Slots are cache keys taken with an atomic ``add``; one whose request
+    never released it, as its worker died, frees itself after
+    ``HEAVY_REQUEST_TIMEOUT`` seconds. Returns the key, or None when
+    every slot is taken.
+    """
+    slots = settings.HEAVY_REQUEST_SLOTS
+    start = random.randrange(slots)
+    for number in range(start, start + slots):
+        key = f'{HEAVY_SLOT_PREFIX}:{number % slots}'
+        if cache.add(key, True, settings.HEAVY_REQUEST_TIMEOUT):
+            return key
+    return None
+
+
+class AdmissionControlMixin:
+    """Throttle weights and a concurrency cap for the actions of a viewset.
+
+    ``throttle_weights`` maps actions to the tokens they take from the
+    client's bucket, one by default. At most ``HEAVY_REQUEST_SLOTS``
+    ``heavy_actions`` run at once across the site; others are turned
+    away with ``429`` and a ``Retry-After`` of
+    ``HEAVY_REQUEST_RETRY_AFTER`` seconds rather than left to queue
+    until they time out.
+    """
+    throttle_weights: Dict[str, int] = {}
+    heavy_actions: Tuple[str, ...] = ()
+    heavy_slot: Optional[str] = None
+
+    def get_throttle_weight(self) -> int:
+        return self.throttle_weights.get(self.action, 1)
+
+    def check_throttles(self, request):
+        """Skip the throttles when an async view has charged the request."""
+        if not getattr(request._request, 'skip_throttles', False):
+            super().check_throttles(request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.heavy_actions:
+            self.heavy_slot = acquire_heavy_slot()
+            if self.heavy_slot is None:
+                raise Throttled(wait=settings.HEAVY_REQUEST_RETRY_AFTER)
+
+    def release_heavy_slot(self) -> None:
+        if self.heavy_slot is not None:
+            cache.delete(self.heavy_slot)
+            self.heavy_slot = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self.release_heavy_slot()
+        return super().finalize_response(request, response, *args, **kwargs)
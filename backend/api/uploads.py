@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.files.uploadhandler import (StopUpload,
+                                             TemporaryFileUploadHandler)
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import MultiPartParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'payload_too_large'
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file, giving up past the size limit.
+
+    The request is marked ``upload_too_large``, so that
+    ``LimitedMultiPartParser`` answers ``413`` rather than going on
+    without the file.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.request.upload_too_large = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+class LimitedMultiPartParser(MultiPartParser):
+    """Reject oversized multipart bodies.
+
+    A declared ``Content-Length`` is checked before reading the body;
+    chunked or under-declared bodies are stopped by
+    ``LimitedTemporaryFileUploadHandler`` once they grow past the limit.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        content_length = request.META.get('CONTENT_LENGTH') or '0'
+        if not content_length.isdigit():
+            raise ParseError('Invalid Content-Length.')
+        if int(content_length) > settings.UPLOAD_MAX_SIZE:
+            raise PayloadTooLarge()
+        data = super().parse(stream, media_type, parser_context)
+        if getattr(request._request, 'upload_too_large', False):
+            raise PayloadTooLarge()
+        return data
@@ -1,7 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from api.views import (BatchView, DatabasePoolsView, IngredientViewSet,
+                       JobViewSet, RecipeExportView, RecipeImportView,
+                       RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -9,8 +11,15 @@ router_v1 = DefaultRouter()
 router_v1.register('recipes', RecipeViewSet, 'recipes')
 router_v1.register('ingredients', IngredientViewSet, 'ingredients')
 router_v1.register('tags', TagViewSet, 'tags')
+router_v1.register('jobs', JobViewSet, 'jobs')
 
 urlpatterns = (
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('db/pools/', DatabasePoolsView.as_view(), name='db-pools'),
+    path('recipes/export/', RecipeExportView.as_view(),
+         name='recipes-export'),
+    path('recipes/import/', RecipeImportView.as_view(),
+         name='recipes-import'),
     path('', include(router_v1.urls)),
     path('', include('users.urls')),
 )
@@ -1,72 +1,166 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.http import FileResponse, StreamingHttpResponse
 from django_filters import rest_framework
+from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.permissions import (AllowAny, IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from rest_framework.viewsets import (GenericViewSet, ModelViewSet,
+                                     ReadOnlyModelViewSet)
 
-from api.limit import PaginationLimit
-from api.serializers import (IngredientSerializer, RecipeCreateSerializer,
-                             RecipeSerializer, TagSerializer)
+from api.batch import run_batch
+from api.cache import CachedResponseMixin
+from api.conditional import ConditionalGetMixin, get_viewer_version
+from api.limit import ApproximateCountPagination, OwnedRecipePagination
+from api.serializers import (BatchSerializer, IngredientSerializer,
+                             JobSerializer, RecipeChangesQuerySerializer,
+                             RecipeCreateSerializer,
+                             RecipeImportQuerySerializer, RecipeSerializer,
+                             ShortRecipeSerializer, TagSerializer)
+from api.sparse import SparseFieldsViewMixin
+from api.throttling import AdmissionControlMixin
+from api.uploads import LimitedMultiPartParser
+from foodgram.cache import get_catalogue_version, get_recipe_version
+from foodgram.db.pool import get_pools
+from foodgram.middleware import SAFE_METHODS
+from foodgram.routers import reading_from
+from jobs.models import Job
+from jobs.queue import INTERACTIVE, enqueue
+from recipes.changes import read_changes
+from recipes.deletion import soft_delete_recipes
+from recipes.exports import EXPORT_CONTENT_TYPES, EXPORT_FORMATS, iter_recipes
 from recipes.filters import IngredientFilter, RecipeFilter
 from recipes.helpers import FavoriteCreateDelete, ShoppingCartToPDF
+from recipes.importers import RecipeImporter, read_bundle
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.tasks import SHOPPING_CART_PDF_TASK
 from users.models import Follow
 
 User = get_user_model()
 
 
-class RecipeViewSet(ModelViewSet):
+def prefers_async(request) -> bool:
+    """Whether the client sent ``Prefer: respond-async`` (RFC 7240)."""
+    preferences = request.headers.get('Prefer', '').split(',')
+    return any(preference.split(';')[0].strip().lower() == 'respond-async'
+               for preference in preferences)
+
+
+class RecipeViewSet(AdmissionControlMixin, ConditionalGetMixin,
+                    CachedResponseMixin, SparseFieldsViewMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     filter_backends = (rest_framework.DjangoFilterBackend,)
     filterset_class = RecipeFilter
     lookup_url_kwarg = 'recipe_id'
-    pagination_class = PaginationLimit
+    pagination_class = ApproximateCountPagination
+    parser_classes = (JSONParser, LimitedMultiPartParser, FormParser)
+    throttle_weights = {
+        'create': 5,
+        'update': 5,
+        'partial_update': 5,
+        'changes': 5,
+        'download_shopping_cart': 30,
+    }
+    heavy_actions = ('download_shopping_cart',)
 
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
         user_queryset = User.objects.all()
         if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_favorited=Exists(Subquery(
-                    Favorite.objects.filter(owner=user, recipe=OuterRef('pk'))
-                ))
-            ).annotate(
-                is_in_shopping_cart=Exists(Subquery(
-                    ShoppingCart.objects.filter(
-                        owner=user,
-                        recipe=OuterRef('pk')
-                    )))
-            )
+            if self.wants_field('is_favorited'):
+                queryset = queryset.annotate(
+                    is_favorited=self.viewer_has(Favorite)
+                )
+            if self.wants_field('is_in_shopping_cart'):
+                queryset = queryset.annotate(
+                    is_in_shopping_cart=self.viewer_has(ShoppingCart)
+                )
             user_queryset = user_queryset.annotate(
                 is_subscribed=Exists(Subquery(
                     Follow.objects.filter(user=user, following=OuterRef('pk'))
                 ))
             )
-        if self.action == 'list':
+        if self.action in ('list', 'changes'):
             return queryset.prefetch_related(
-                Prefetch('author', user_queryset)
-            ).prefetch_related(
-                'tags'
-            ).prefetch_related(
-                'recipe_ingredient'
-            ).prefetch_related(
-                'recipe_ingredient__ingredient'
+                *self.get_prefetches(user_queryset)
             )
         return queryset
 
+    def get_prefetches(self, user_queryset):
+        prefetches = []
+        if self.expands_field('author'):
+            prefetches.append(Prefetch('author', user_queryset))
+        if self.wants_field('tags'):
+            prefetches.append('tags')
+        if self.wants_field('ingredients'):
+            prefetches.append('recipe_ingredient')
+        if self.expands_field('ingredients'):
+            prefetches.append('recipe_ingredient__ingredient')
+        return prefetches
+
+    def viewer_has(self, model):
+        return Exists(Subquery(
+            model.objects.filter(owner=self.request.user,
+                                 recipe=OuterRef('pk'))
+        ))
+
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    def get_validators(self):
+        viewer = get_viewer_version(self.request.user)
+        if self.action == 'list':
+            version = get_catalogue_version()
+            last_modified = datetime.fromtimestamp(version[0], timezone.utc)
+            return (version, viewer), last_modified
+        if self.action == 'retrieve':
+            queryset = super().get_queryset()
+            fields = ['updated_at', 'author__updated_at']
+            if self.request.user.is_authenticated:
+                queryset = queryset.annotate(
+                    is_favorited=self.viewer_has(Favorite),
+                    is_in_shopping_cart=self.viewer_has(ShoppingCart),
+                    is_subscribed=Exists(Follow.objects.filter(
+                        user=self.request.user, following=OuterRef('author')
+                    )),
+                )
+                fields += ['is_favorited', 'is_in_shopping_cart',
+                           'is_subscribed']
+            recipe = get_object_or_404(queryset.values_list(*fields),
+                                       pk=self.kwargs['recipe_id'])
+            version = get_recipe_version(
+                self.kwargs['recipe_id'],
+                Recipe.tags.through.objects.filter(
+                    recipe_id=self.kwargs['recipe_id']
+                ).values_list('tag_id', flat=True),
+            )
+            changed_at = datetime.fromtimestamp(version[0], timezone.utc)
+            return (recipe, version, viewer), max(*recipe[:2], changed_at)
+        return None
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete_recipes((instance.pk,), owner=self.request.user)
+
     def get_permissions(self):
-        if self.action in ('favorite', 'shopping_cart',
+        if self.action in ('favorite', 'shopping_cart', 'favorites', 'cart',
                            'download_shopping_cart',):
             return IsAuthenticated(),
         return IsAuthenticatedOrReadOnly(),
@@ -99,10 +193,95 @@ class RecipeViewSet(ModelViewSet):
             return shopping_cart.create()
         return shopping_cart.delete()
 
+    def list_owned(self, model):
+        """Recipes in the user's ``model`` rows, the latest added first.
+
+        The query starts from the user's rows through their
+        ``(owner, -pub_date, recipe)`` index and joins the recipes, so it
+        costs as much as the user's list is long, whatever the size of
+        the catalogue.
+        """
+        entries = model.objects.filter(
+            owner=self.request.user, recipe__is_deleted=False
+        ).select_related('recipe')
+        paginator = OwnedRecipePagination()
+        page = paginator.paginate_queryset(entries, self.request, self)
+        serializer = ShortRecipeSerializer(
+            [entry.recipe for entry in page], many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=('get',), detail=False)
+    def favorites(self, request, *args, **kwargs):
+        return self.list_owned(Favorite)
+
+    @action(methods=('get',), detail=False)
+    def cart(self, request, *args, **kwargs):
+        return self.list_owned(ShoppingCart)
+
     @action(methods=('get',), detail=False)
     def download_shopping_cart(self, request, *args, **kwargs):
-        pdf = ShoppingCartToPDF()
-        return pdf.generate_pdf(request)
+        """The shopping list as a PDF file.
+
+        With ``Prefer: respond-async``, it is rendered by a job instead:
+        the answer is ``202 Accepted`` with the job, polled at its
+        ``Location`` until it has a ``result_url``.
+        """
+        if not prefers_async(request):
+            pdf = ShoppingCartToPDF()
+            return pdf.generate_pdf(request)
+        job = enqueue(SHOPPING_CART_PDF_TASK, {'user_id': request.user.pk},
+                      owner=request.user, priority=INTERACTIVE)
+        serializer = JobSerializer(job, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': reverse(
+                            'api:jobs-detail', kwargs={'job_id': job.pk},
+                            request=request,
+                        )})
+
+    @action(methods=('get',), detail=False)
+    def changes(self, request, *args, **kwargs):
+        query = RecipeChangesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        page = read_changes(**query.validated_data)
+        recipes = self.get_serializer(
+            self.get_queryset().filter(pk__in=page.upserted), many=True
+        ).data
+        found = {recipe['id'] for recipe in recipes}
+        return Response({
+            'cursor': page.cursor,
+            'has_more': page.has_more,
+            'results': recipes,
+            'deleted': page.deleted + [recipe_id
+                                       for recipe_id in page.upserted
+                                       if recipe_id not in found],
+        })
+
+
+class JobViewSet(RetrieveModelMixin, GenericViewSet):
+    """Status of the jobs the user started, and the files they made."""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+    lookup_url_kwarg = 'job_id'
+
+    def dispatch(self, request, *args, **kwargs):
+        # A job is written by the request starting it, which may be a safe
+        # one, and by the workers, so replicas may not have it yet.
+        with reading_from(None):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    @action(methods=('get',), detail=True)
+    def result(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != Job.DONE or not (job.result or {}).get('file'):
+            raise NotFound('The job has not made a file.')
+        return FileResponse(default_storage.open(job.result['file']),
+                            filename=job.result['filename'],
+                            content_type=job.result['content_type'])
 
 
 class IngredientViewSet(ReadOnlyModelViewSet):
@@ -115,3 +294,82 @@ class IngredientViewSet(ReadOnlyModelViewSet):
 class TagViewSet(ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+
+
+class RecipeExportView(APIView):
+    """Stream the catalogue as JSON Lines, or CSV with ``?output=csv``."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'jsonl')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Choose one of: '
+                                             f'{", ".join(EXPORT_FORMATS)}.'})
+        response = StreamingHttpResponse(
+            EXPORT_FORMATS[output](iter_recipes()),
+            content_type=EXPORT_CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{output}"'
+        )
+        return response
+
+
+class RecipeImportView(APIView):
+    """Create recipes of the user from a JSON Lines bundle.
+
+    Records are described in ``RecipeImporter``; invalid ones are reported
+    with their line numbers. ``checkpoint`` is the last line read, so an
+    interrupted import resumes with ``?after=<checkpoint>``.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        query = RecipeImportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        size = request.META.get('CONTENT_LENGTH') or '0'
+        if not size.isdigit() or int(size) > settings.RECIPE_IMPORT_MAX_SIZE:
+            raise ValidationError('Send a bundle of at most '
+                                  f'{settings.RECIPE_IMPORT_MAX_SIZE} bytes.')
+        checkpoint = query.validated_data['after']
+        created, errors = [], []
+        with RecipeImporter(request.user,
+                            settings.RECIPE_IMPORT_BATCH_SIZE) as importer:
+            for result in importer.load(read_bundle(request._request,
+                                                    checkpoint)):
+                checkpoint = result.line
+                created += result.created
+                errors += [error._asdict() for error in result.errors]
+        return Response(
+            {'checkpoint': checkpoint, 'created': created, 'errors': errors},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class BatchView(APIView):
+    """Run several API requests in one, see ``api.batch.run_batch``.
+
+    The batch is authenticated once, and each operation as well as the
+    batch itself answers with its own status: ``{"responses": [{"status",
+    "headers", "body"}]}``. A batch of reads does not pin the client to
+    the primary database.
+    """
+    permission_classes = (AllowAny,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        request._request.skip_primary_pin = all(
+            operation['method'] in SAFE_METHODS for operation in operations
+        )
+        return Response({'responses': run_batch(request, operations)})
+
+
+class DatabasePoolsView(APIView):
+    """Utilisation and wait times of this worker's connection pools."""
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response({alias: pool.stats()
+                         for alias, pool in get_pools().items()})
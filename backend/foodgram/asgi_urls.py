@@ -0,0 +1,12 @@
+from django.urls import path
+
+from api import async_views
+from foodgram.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/recipes/', async_views.recipe_list),
+    path('api/recipes/<int:recipe_id>/', async_views.recipe_detail),
+    path('api/ingredients/', async_views.ingredient_list),
+    path('api/tags/', async_views.tag_list),
+    path('api/users/subscriptions/', async_views.subscriptions),
+] + sync_urlpatterns
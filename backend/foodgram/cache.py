@@ -0,0 +1,85 @@
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+
+CACHE_TAG_PREFIX = 'cache-tag'
+RECIPE_LIST_TAG = 'recipes:list'
+INGREDIENTS_TAG = 'ingredients'
+# Invalidated along with every other tag.
+CATALOGUE_TAG = 'catalogue'
+
+Version = Tuple[float, str]
+
+
+def recipe_tag(recipe_id: int) -> str:
+    return f'recipe:{recipe_id}'
+
+
+def author_tag(user_id: int) -> str:
+    return f'author:{user_id}'
+
+
+def tag_tag(tag_id: int) -> str:
+    return f'tag:{tag_id}'
+
+
+def _version_key(tag: str) -> str:
+    return f'{CACHE_TAG_PREFIX}:{tag}'
+
+
+def _new_version() -> Version:
+    return time.time(), uuid.uuid4().hex
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    """Give the tags new versions, so entries tagged with them go stale.
+
+    ``CATALOGUE_TAG`` gets a new version too.
+    """
+    tags = {*tags, CATALOGUE_TAG}
+    cache.set_many({_version_key(tag): _new_version() for tag in tags},
+                   timeout=None)
+
+
+def invalidate_recipes(recipe_ids: Iterable[int]) -> None:
+    invalidate_tags(recipe_tag(recipe_id) for recipe_id in recipe_ids)
+
+
+def get_tag_versions(tags: Iterable[str]) -> Dict[str, Optional[Version]]:
+    keys = {_version_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    return {tag: versions.get(key) for key, tag in keys.items()}
+
+
+def add_missing_versions(versions: Dict[str, Optional[Version]]) -> None:
+    """Give the tags without a version one, in place."""
+    missing = [tag for tag, version in versions.items() if version is None]
+    for tag in missing:
+        cache.add(_version_key(tag), _new_version(), timeout=None)
+    if missing:
+        versions.update(get_tag_versions(missing))
+
+
+def get_catalogue_version() -> Version:
+    """Version of ``CATALOGUE_TAG``, the time and id of the last change.
+
+    It changes whenever a recipe, author, tag or ingredient does, so it
+    validates recipe lists with one cache read.
+    """
+    versions = get_tag_versions((CATALOGUE_TAG,))
+    add_missing_versions(versions)
+    return versions[CATALOGUE_TAG]
+
+
+def get_recipe_version(recipe_id: int, tag_ids: Iterable[int]) -> Version:
+    """The last version of the tags a recipe response depends on.
+
+    These are the tags of the recipe, of its tags and of the
+    ingredients, so it changes when its links or their names do.
+    """
+    versions = get_tag_versions((recipe_tag(recipe_id), INGREDIENTS_TAG,
+                                 *map(tag_tag, tag_ids)))
+    add_missing_versions(versions)
+    return max(versions.values())
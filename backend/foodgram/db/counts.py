@@ -0,0 +1,53 @@
+import json
+from typing import Tuple
+
+from django.conf import settings
+from django.db import connections
+
+
+def get_planned_rows(queryset) -> int:
+    """The number of rows PostgreSQL's planner expects the query to return."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_table_rows(queryset) -> int:
+    """Rows of the whole table from its statistics, -1 if never analyzed."""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        return cursor.fetchone()[0]
+
+
+def is_unfiltered(queryset) -> bool:
+    query = queryset.query
+    return not (query.where or query.distinct or query.combinator
+                or query.is_sliced)
+
+
+def estimate_count(queryset) -> Tuple[int, bool]:
+    """Count the rows, estimated when there are many of them.
+
+    Returns the count and whether it is an estimate. On PostgreSQL, the
+    rows of a whole table come from its statistics and those of other
+    queries from the planner; when that gives at least
+    ``ESTIMATED_COUNT_THRESHOLD`` rows it is returned, as ``COUNT(*)``
+    would read all of them. Smaller results and other databases get an
+    exact count.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = (get_table_rows(queryset) if is_unfiltered(queryset)
+                    else -1)
+        if estimate < 0:
+            estimate = get_planned_rows(queryset)
+        if estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
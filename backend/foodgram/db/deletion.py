@@ -0,0 +1,38 @@
+from typing import Callable, Optional
+
+from django.db import models
+
+
+class SoftDeleteManagerMixin:
+    """Leave out the rows marked ``is_deleted``, waiting to be purged."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class SoftDeleteManager(SoftDeleteManagerMixin, models.Manager):
+    pass
+
+
+def delete_in_batches(queryset, batch_size: int,
+                      on_batch: Optional[Callable[[int], None]] = None
+                      ) -> int:
+    """Delete the rows of the queryset ``batch_size`` at a time.
+
+    Each batch is one ``DELETE ... WHERE pk IN (...)`` committed on its
+    own, so locks are held only briefly. Unlike ``QuerySet.delete()``,
+    nothing is collected in Python: no signals are sent and nothing
+    cascades, so rows referring to these must be deleted first.
+    ``on_batch`` gets the number of rows deleted so far. Returns it.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += model._base_manager.filter(pk__in=batch)._raw_delete(
+            queryset.db
+        )
+        if on_batch is not None:
+            on_batch(deleted)
@@ -0,0 +1,81 @@
+from django.db.migrations.operations.base import Operation
+
+
+class AddPrefixSearchIndex(Operation):
+    """Index ``UPPER(column) text_pattern_ops`` on PostgreSQL.
+
+    It serves the case-insensitive prefix lookups (``istartswith``) that
+    admin searches such as ``^name`` run. The index is built
+    concurrently, so the migration must not be atomic. Other databases
+    are left as they are.
+    """
+    reduces_to_sql = False
+    suffix = 'upper_like'
+    method = 'btree'
+    opclass = 'text_pattern_ops'
+    extension = None
+
+    def __init__(self, model_name: str, field_name: str) -> None:
+        self.model_name = model_name
+        self.field_name = field_name
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def get_index(self, app_label, schema_editor, state):
+        model = state.apps.get_model(app_label, self.model_name)
+        if (schema_editor.connection.vendor != 'postgresql'
+                or not self.allow_migrate_model(
+                    schema_editor.connection.alias, model)):
+            return None
+        table = model._meta.db_table
+        column = model._meta.get_field(self.field_name).column
+        return table, column, f'{table}_{column}_{self.suffix}'
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        index = self.get_index(app_label, schema_editor, to_state)
+        if index is None:
+            return
+        table, column, name = index
+        quote = schema_editor.quote_name
+        if self.extension:
+            schema_editor.execute(
+                f'CREATE EXTENSION IF NOT EXISTS {quote(self.extension)}'
+            )
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} '
+            f'ON {quote(table)} USING {self.method} '
+            f'(UPPER({quote(column)}::text) {self.opclass})'
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        index = self.get_index(app_label, schema_editor, from_state)
+        if index is None:
+            return
+        schema_editor.execute(
+            f'DROP INDEX CONCURRENTLY IF EXISTS '
+            f'{schema_editor.quote_name(index[2])}'
+        )
+
+    def describe(self):
+        return (f'Add a prefix search index on '
+                f'{self.model_name}.{self.field_name}')
+
+
+class AddTrigramSearchIndex(AddPrefixSearchIndex):
+    """Index ``UPPER(column) gin_trgm_ops`` on PostgreSQL.
+
+    It serves the case-insensitive substring lookups (``icontains``) of
+    three characters or more. The ``pg_trgm`` extension is created when
+    missing.
+    """
+    suffix = 'upper_trgm'
+    method = 'gin'
+    opclass = 'gin_trgm_ops'
+    extension = 'pg_trgm'
+
+    def describe(self):
+        return (f'Add a trigram search index on '
+                f'{self.model_name}.{self.field_name}')
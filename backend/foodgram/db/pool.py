@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, NamedTuple, Tuple
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5,
+    'HEALTH_CHECK_AFTER': 10,
+    'MAX_LIFETIME': 1800,
+}
+
+
+class PoolTimeoutError(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class IdleConnection(NamedTuple):
+    connection: Any
+    created_at: float
+    returned_at: float
+
+
+class ConnectionPool:
+    """A bounded pool of open database connections.
+
+    At most ``max_size`` connections are checked out at once; callers
+    wait up to ``timeout`` seconds for a free one. Idle connections are
+    reused most recent first. One idle for more than
+    ``health_check_after`` seconds is checked with ``check`` before it
+    is handed out, and one older than ``max_lifetime`` is replaced.
+    """
+
+    def __init__(self, max_size: int, timeout: float,
+                 health_check_after: float, max_lifetime: float,
+                 database: tuple = ()) -> None:
+        self.database: tuple = database
+        self.max_size: int = max_size
+        self.timeout: float = timeout
+        self.health_check_after: float = health_check_after
+        self.max_lifetime: float = max_lifetime
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle: Deque[IdleConnection] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._in_use: int = 0
+        self._counters: Dict[str, float] = dict.fromkeys((
+            'checkouts', 'connects', 'timeouts', 'health_check_failures',
+            'discarded', 'wait_time', 'max_wait_time',
+        ), 0)
+
+    def acquire(self, connect: Callable[[], Any],
+                check: Callable[[Any], bool]) -> Any:
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count('timeouts')
+            raise PoolTimeoutError(
+                f'No free connection in {self.timeout} seconds, '
+                f'{self.max_size} are in use.'
+            )
+        waited = time.monotonic() - started
+        try:
+            connection = self._take_idle(check)
+            if connection is None:
+                connection = connect()
+                self._count('connects')
+                with self._lock:
+                    self._created_at[id(connection)] = time.monotonic()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self._counters['checkouts'] += 1
+            self._counters['wait_time'] += waited
+            self._counters['max_wait_time'] = max(
+                self._counters['max_wait_time'], waited
+            )
+        return connection
+
+    def release(self, connection: Any, reusable: bool = True) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(connection), now)
+            reusable = reusable and now - created_at < self.max_lifetime
+            if reusable:
+                self._idle.append(IdleConnection(connection, created_at, now))
+        if not reusable:
+            self._discard(connection)
+        self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for entry in idle:
+            self._discard(entry.connection)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            checkouts = self._counters['checkouts']
+            return {
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'utilisation': self._in_use / self.max_size,
+                **self._counters,
+                'mean_wait_time': (self._counters['wait_time'] / checkouts
+                                   if checkouts else 0),
+            }
+
+    def _take_idle(self, check: Callable[[Any], bool]) -> Any:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                entry = self._idle.pop()
+            now = time.monotonic()
+            if now - entry.created_at < self.max_lifetime:
+                if (now - entry.returned_at < self.health_check_after
+                        or check(entry.connection)):
+                    return entry.connection
+                self._count('health_check_failures')
+            self._discard(entry.connection)
+
+    def _discard(self, connection: Any) -> None:
+        with self._lock:
+            self._created_at.pop(id(connection), None)
+            self._counters['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+_pools: Dict[Tuple[str, int], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, database: tuple, options: dict) -> ConnectionPool:
+    """The pool of the database in this process, created on first use.
+
+    ``database`` identifies the server and the database; when it changes,
+    as the test runner does, the idle connections of the old pool close.
+    """
+    key = (alias, os.getpid())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.database != database:
+            if pool is not None:
+                pool.close()
+            options = {**POOL_DEFAULTS, **options}
+            pool = _pools[key] = ConnectionPool(
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                health_check_after=options['HEALTH_CHECK_AFTER'],
+                max_lifetime=options['MAX_LIFETIME'],
+                database=database,
+            )
+        return pool
+
+
+def get_pools() -> Dict[str, ConnectionPool]:
+    """Pools of this process by database alias."""
+    pid = os.getpid()
+    return {alias: pool for (alias, pool_pid), pool in _pools.items()
+            if pool_pid == pid}
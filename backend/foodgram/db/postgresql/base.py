@@ -0,0 +1,70 @@
+import weakref
+from functools import partial
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.base import Database
+
+from foodgram.db.pool import ConnectionPool, PoolTimeoutError, get_pool
+
+
+def is_healthy(connection) -> bool:
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+def reset(connection) -> bool:
+    """Roll back what the last user left open, if the connection lives."""
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == Database.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != Database.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            connection.rollback()
+        except Database.Error:
+            return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend taking connections from a per-process pool.
+
+    Closing the connection, which Django does at the end of every request
+    with ``CONN_MAX_AGE = 0``, returns it to the pool. The pool is keyed
+    by the process id, so forked workers never share a socket. A wrapper
+    that is garbage collected without being closed, such as one left by
+    a finished async task, gives its slot back through a finalizer.
+    """
+
+    def get_pool(self) -> ConnectionPool:
+        database = tuple(self.settings_dict[key]
+                         for key in ('HOST', 'PORT', 'NAME', 'USER'))
+        return get_pool(self.alias, database,
+                        self.settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool()
+        try:
+            connection = pool.acquire(
+                partial(super().get_new_connection, conn_params), is_healthy
+            )
+        except PoolTimeoutError as error:
+            raise Database.OperationalError(str(error)) from error
+        self._pool = pool
+        self._pool_finalizer = weakref.finalize(self, pool.release,
+                                                connection, False)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        self._pool_finalizer.detach()
+        reusable = not self.in_atomic_block and reset(self.connection)
+        self._pool.release(self.connection, reusable)
@@ -0,0 +1,123 @@
+from hashlib import sha256
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from foodgram.routers import choose_replica, reading_from
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_PIN_PREFIX = 'db-primary'
+
+
+def get_primary_pin_key(request) -> str:
+    client = (request.META.get('HTTP_AUTHORIZATION')
+              or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+              or request.META.get('REMOTE_ADDR', ''))
+    return f'{PRIMARY_PIN_PREFIX}:{sha256(client.encode()).hexdigest()}'
+
+
+class ReplicaRoutingMiddleware:
+    """Read from a replica on safe requests, except right after a write.
+
+    One replica, chosen at random, serves every read of a request.
+    A client that sent a write reads from the primary for the next
+    ``PRIMARY_PIN_TIME`` seconds, so it sees its own changes even when
+    the replicas lag behind. Views may set ``skip_primary_pin`` on a
+    request they did not write on, such as a batch of reads.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if getattr(request, 'skip_primary_pin', False):
+                return response
+            cache.set(get_primary_pin_key(request), True,
+                      settings.PRIMARY_PIN_TIME)
+            return response
+        replica = None
+        if (settings.DATABASE_REPLICAS
+                and not cache.get(get_primary_pin_key(request))):
+            replica = choose_replica()
+        with reading_from(replica):
+            return self.get_response(request)
+
+
+# In order of preference.
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda content: brotli.compress(
+        content, quality=settings.BROTLI_QUALITY
+    )
+COMPRESSORS['gzip'] = compress_string
+
+
+def get_accepted_encodings(header: str) -> Dict[str, float]:
+    """Quality values of the codings in an ``Accept-Encoding`` header."""
+    encodings = {}
+    for coding in header.split(','):
+        name, _, params = coding.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip():
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """The supported coding the client prefers, brotli on a tie."""
+    accepted = get_accepted_encodings(header)
+    encoding, best_quality = None, 0.0
+    for name in COMPRESSORS:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            encoding, best_quality = name, quality
+    return encoding
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli or gzip, as the client accepts.
+
+    Responses shorter than ``COMPRESSION_MIN_SIZE`` bytes, streaming
+    ones and those already encoded are sent as they are. Like
+    ``GZipMiddleware``, strong ETags become weak, as the bytes differ
+    from what they were computed for.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        compressed = COMPRESSORS[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
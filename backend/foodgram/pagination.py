@@ -0,0 +1,58 @@
+from typing import Optional
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.utils.functional import cached_property
+
+from foodgram.db.counts import estimate_count
+
+
+class EstimatedPage(Page):
+    """A page that may know by itself whether rows follow it.
+
+    ``has_more`` is set when a row past the page was fetched along with
+    it; until then, ``has_next`` goes by the count.
+    """
+    has_more: Optional[bool] = None
+
+    def has_next(self) -> bool:
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginate with an estimated count of large querysets.
+
+    ``count_is_approximate`` tells whether the count is an estimate. As
+    it may be short of the real count, pages past the last counted one
+    are allowed: they hold whatever rows there are, and one more row is
+    fetched to tell whether another page follows.
+    """
+    count_is_approximate = False
+
+    @cached_property
+    def count(self) -> int:
+        count, self.count_is_approximate = estimate_count(self.object_list)
+        return count
+
+    def validate_number(self, number) -> int:
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number) -> Page:
+        number = self.validate_number(number)
+        if not (self.count and self.count_is_approximate):
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        page = self._get_page(objects[:self.per_page], number, self)
+        page.has_more = len(objects) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs) -> EstimatedPage:
+        return EstimatedPage(*args, **kwargs)
@@ -0,0 +1,50 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+PRIMARY_DATABASE = 'default'
+
+read_database: ContextVar[Optional[str]] = ContextVar('read_database',
+                                                      default=None)
+
+
+def choose_replica() -> Optional[str]:
+    """A random replica, or None when there are none."""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def reading_from(alias: Optional[str]) -> Iterator[None]:
+    """Send the reads in the block to ``alias``, or the primary if None."""
+    token = read_database.set(alias)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the database in ``read_database``.
+
+    ``foodgram.middleware.ReplicaRoutingMiddleware`` sets it to one
+    replica for the whole of a safe request, so all of its queries see
+    the same snapshot; management commands, workers and writes use the
+    primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get() or PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
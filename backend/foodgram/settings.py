@@ -29,19 +29,22 @@ INSTALLED_APPS = [
     'api',
     'recipes',
     'users',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', default='foodgram.urls')
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
@@ -66,7 +69,7 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': os.getenv(
-            'DB_ENGINE', default='django.db.backends.postgresql'
+            'DB_ENGINE', default='foodgram.db.postgresql'
         ),
         'NAME': os.getenv(
             'DB_NAME', default='foodgram'
@@ -83,6 +86,38 @@ DATABASES = {
         'PORT': os.getenv(
             'DB_PORT', default='5432'
         ),
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', default=5)),
+        },
+    }
+}
+
+DATABASE_LOCATION_KEY = (
+    'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+)
+for number, location in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(',')), start=1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        DATABASE_LOCATION_KEY: location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['foodgram.routers.PrimaryReplicaRouter']
+PRIMARY_PIN_TIME = 10
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', default='foodgram'
+        ),
     }
 }
 
@@ -116,6 +151,44 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static_backend')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = [
+    'api.uploads.LimitedTemporaryFileUploadHandler',
+]
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+
+RECIPE_IMAGE_SIZES = {
+    'card': 480,
+    'detail': 960,
+    'retina': 1920,
+}
+RECIPE_IMAGE_QUALITY = 80
+
+RECIPE_CHANGES_PAGE_SIZE = 100
+RECIPE_CHANGES_MAX_PAGE_SIZE = 500
+RECIPE_CHANGES_BATCH_SIZE = 500
+
+EXPORT_CHUNK_SIZE = 2000
+RECIPE_IMPORT_BATCH_SIZE = 200
+# Keep client_max_body_size of the import location in nginx.conf in step.
+RECIPE_IMPORT_MAX_SIZE = 50 * 1024 * 1024
+
+BATCH_MAX_OPERATIONS = 20
+BATCH_WORKERS = 4
+
+HEAVY_REQUEST_SLOTS = 8
+HEAVY_REQUEST_TIMEOUT = 60
+HEAVY_REQUEST_RETRY_AFTER = 5
+
+JOB_WORKER_CONCURRENCY = 4
+JOB_POLL_INTERVAL = 1
+JOB_LEASE_TIME = 15 * 60
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+JOB_RESULTS_DIR = 'jobs'
+JOB_RETENTION_TIME = 7 * 24 * 60 * 60
+JOB_PURGE_INTERVAL = 60 * 60
+PURGE_BATCH_SIZE = 500
+
 RECIPE_LIMIT_SUBSCRIBE = 25
 DEFAULT_PAGE_PAGINATION = 25
 MAX_PAGE_PAGINATION = 100
@@ -131,14 +204,37 @@ CORS_URLS_REGEX = r'^/api/.*$'
 
 AUTH_USER_MODEL = 'users.User'
 
+TOKEN_CACHE_TIMEOUT = 30
+RESPONSE_CACHE_TIMEOUT = 300
+RESPONSE_CACHE_LOCK_TIMEOUT = 5
+RESPONSE_CACHE_LOCK_POLL = 0.05
+
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 4
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.AnonTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.getenv('THROTTLE_USER_RATE', default='600/min'),
+        'anon': os.getenv('THROTTLE_ANON_RATE', default='300/min'),
+    },
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
 DJOSER = {
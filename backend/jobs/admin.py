@@ -0,0 +1,15 @@
+from django.contrib.admin import register
+
+from foodgram.admin import AutocompleteFilter, ScalableModelAdmin
+
+from .models import Job
+
+
+@register(Job)
+class JobAdmin(ScalableModelAdmin):
+    list_display = ('pk', 'task', 'status', 'priority', 'attempts',
+                    'owner', 'created_at', 'finished_at')
+    list_filter = ('status', 'task', ('owner', AutocompleteFilter))
+    search_fields = ('^task',)
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
@@ -0,0 +1,76 @@
+import logging
+import signal
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from jobs.queue import claim_job, purge_expired_jobs, run_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Run background jobs from the database queue, several at a '
+            'time, until stopped with SIGINT or SIGTERM. Every '
+            'JOB_PURGE_INTERVAL seconds, jobs finished over '
+            'JOB_RETENTION_TIME seconds ago are deleted with their files.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=settings.JOB_WORKER_CONCURRENCY,
+                            help='jobs run at once, one thread each')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOB_POLL_INTERVAL,
+                            help='seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, self.stop)
+        threads = [
+            threading.Thread(target=self.work, name=f'jobs-{number}',
+                             args=(options['poll_interval'],
+                                   options['burst']))
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        if not options['burst']:
+            while not self.stopping.wait(settings.JOB_PURGE_INTERVAL):
+                self.purge()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS('The worker has stopped.'))
+
+    def stop(self, signal_number, frame) -> None:
+        """Let the running jobs finish, then exit."""
+        self.stopping.set()
+
+    def purge(self) -> None:
+        close_old_connections()
+        try:
+            purge_expired_jobs(timezone.now() - timedelta(
+                seconds=settings.JOB_RETENTION_TIME
+            ))
+        except Exception:
+            logger.exception('Could not purge expired jobs')
+
+    def work(self, poll_interval: float, burst: bool) -> None:
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                job = claim_job()
+                if job is not None:
+                    run_job(job)
+                    continue
+                if burst:
+                    return
+                self.stopping.wait(poll_interval)
+        finally:
+            connections.close_all()
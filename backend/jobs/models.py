@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def default_max_attempts() -> int:
+    return settings.JOB_MAX_ATTEMPTS
+
+
+class Job(models.Model):
+    """A unit of slow work run by the ``run_jobs`` worker.
+
+    Workers take pending jobs by priority, then by ``run_at``. A taken
+    job is leased until ``locked_until``; when the worker dies, the job
+    is taken again once the lease runs out.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    task = models.CharField(
+        verbose_name='Task',
+        max_length=100,
+    )
+    payload = models.JSONField(
+        verbose_name='Arguments of the task',
+        default=dict,
+        blank=True,
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='jobs',
+        verbose_name='User who started the job',
+        null=True,
+        blank=True,
+    )
+    priority = models.SmallIntegerField(
+        verbose_name='Priority',
+        default=0,
+        help_text='Jobs with a higher priority run first',
+    )
+    status = models.CharField(
+        verbose_name='Status',
+        max_length=7,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Attempts made',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Attempts allowed',
+        default=default_max_attempts,
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Run not before',
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Leased to a worker until',
+        null=True,
+        blank=True,
+    )
+    progress = models.JSONField(
+        verbose_name='Progress',
+        null=True,
+        blank=True,
+    )
+    result = models.JSONField(
+        verbose_name='Result',
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        verbose_name='Last error',
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Date and time of creation',
+        auto_now_add=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Date and time of completion',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = (
+            models.Index(fields=('status', '-priority', 'run_at'),
+                         name='job_queue_idx'),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.task} #{self.pk} ({self.status})'
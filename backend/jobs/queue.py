@@ -0,0 +1,181 @@
+import logging
+import posixpath
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from foodgram.db.deletion import delete_in_batches
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Priorities: a user waits for interactive jobs, nobody for maintenance.
+INTERACTIVE = 10
+DEFAULT = 0
+MAINTENANCE = -10
+
+TASKS: Dict[str, Callable] = {}
+
+current_job: ContextVar[Optional[Job]] = ContextVar('current_job',
+                                                    default=None)
+
+
+def task(name: str) -> Callable[[Callable], Callable]:
+    """Register a function as the task ``name``.
+
+    It is called with the payload of the job as keyword arguments and
+    returns the JSON result of the job. Raising an exception makes the
+    job retry later, so tasks should be safe to run again; long ones
+    call ``report_progress``. Tasks live in the ``tasks`` modules of the
+    apps.
+    """
+    def register(function: Callable) -> Callable:
+        TASKS[name] = function
+        return function
+    return register
+
+
+def enqueue(name: str, payload: Optional[dict] = None, *, owner=None,
+            priority: int = DEFAULT) -> Job:
+    """Add a job; in a transaction, workers see it once it commits."""
+    if name not in TASKS:
+        raise LookupError(f'Unknown task {name}.')
+    return Job.objects.create(task=name, payload=payload or {}, owner=owner,
+                              priority=priority)
+
+
+def ready_jobs(now):
+    """Pending jobs due to run, and running ones whose lease ran out.
+
+    The latter are taken again only while they have attempts left.
+    """
+    return Job.objects.filter(
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now,
+            attempts__lt=F('max_attempts'))
+    ).order_by('-priority', 'run_at', 'pk')
+
+
+def fail_abandoned_jobs(now) -> int:
+    """Fail the jobs whose lease ran out on their last attempt.
+
+    Their worker died while running them, maybe killed by the job
+    itself, so ``run_job`` never recorded the failure.
+    """
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Job.FAILED, locked_until=None, finished_at=now,
+             error='The worker stopped while running the job.')
+
+
+def claim_job() -> Optional[Job]:
+    """Lease the next job to this worker, or return None.
+
+    Rows locked by other workers are skipped on PostgreSQL. The update
+    only succeeds if the job is as it was read, so two workers never
+    take the same job on databases without row locks either.
+    """
+    fail_abandoned_jobs(timezone.now())
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = ready_jobs(now).select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            claimed = Job.objects.filter(
+                pk=job.pk, status=job.status, attempts=job.attempts
+            ).update(
+                status=Job.RUNNING, attempts=job.attempts + 1,
+                locked_until=now + timedelta(seconds=settings.JOB_LEASE_TIME),
+            )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def report_progress(done: int, total: Optional[int] = None) -> None:
+    """Record how far the running job has got, for those polling it.
+
+    It also renews the lease, so a long job is not taken over while it
+    keeps reporting.
+    """
+    job = current_job.get()
+    if job is not None:
+        Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+        ).update(
+            progress={'done': done, 'total': total},
+            locked_until=(timezone.now()
+                          + timedelta(seconds=settings.JOB_LEASE_TIME)),
+        )
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def run_job(job: Job) -> None:
+    """Run a claimed job and record its result or schedule a retry.
+
+    Retries back off exponentially from ``JOB_RETRY_DELAY`` seconds; the
+    job fails after ``max_attempts`` attempts.
+    """
+    token = current_job.set(job)
+    try:
+        handler = TASKS.get(job.task)
+        if handler is None:
+            raise LookupError(f'Unknown task {job.task}.')
+        result = handler(**job.payload)
+    except Exception as error:
+        logger.exception('Job %s failed', job)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            changes = {'status': Job.FAILED, 'finished_at': now}
+        else:
+            changes = {'status': Job.PENDING,
+                       'run_at': now + get_retry_delay(job.attempts)}
+        changes['error'] = f'{type(error).__name__}: {error}'
+    else:
+        changes = {'status': Job.DONE, 'result': result,
+                   'finished_at': timezone.now()}
+    finally:
+        current_job.reset(token)
+    Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(locked_until=None, **changes)
+
+
+def purge_expired_jobs(before) -> int:
+    """Delete the jobs finished before ``before`` and the files they made.
+
+    Then any file in ``JOB_RESULTS_DIR`` older than ``before`` that no
+    job refers to goes, including those of attempts that never recorded
+    their result. Returns the number of jobs deleted.
+    """
+    deleted = delete_in_batches(
+        Job.objects.filter(status__in=(Job.DONE, Job.FAILED),
+                           finished_at__lt=before),
+        settings.PURGE_BATCH_SIZE,
+    )
+    if not default_storage.exists(settings.JOB_RESULTS_DIR):
+        return deleted
+    referenced = {
+        result.get('file')
+        for result in Job.objects.filter(
+            result__isnull=False
+        ).values_list('result', flat=True).iterator()
+        if isinstance(result, dict)
+    }
+    for filename in default_storage.listdir(settings.JOB_RESULTS_DIR)[1]:
+        name = posixpath.join(settings.JOB_RESULTS_DIR, filename)
+        if (name not in referenced
+                and default_storage.get_modified_time(name) < before):
+            default_storage.delete(name)
+    return deleted
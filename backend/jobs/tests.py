@@ -0,0 +1,221 @@
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from jobs.queue import (TASKS, claim_job, enqueue, purge_expired_jobs, run_job,
+                        task)
+from recipes.images import schedule_image_variants
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeChange,
+                            RecipeIngredient, ShoppingCart, Tag)
+from users.models import Follow, User
+
+
+@task('tests.echo')
+def echo(value=None, fail=False):
+    if fail:
+        raise ValueError('Broken.')
+    return {'value': value}
+
+
+class JobQueueTestCase(TestCase):
+
+    def test_jobs_run_by_priority(self):
+        low = enqueue('tests.echo', {'value': 1}, priority=-1)
+        high = enqueue('tests.echo', {'value': 2}, priority=1)
+        job = claim_job()
+        self.assertEqual(job, high)
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 1))
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'value': 2})
+        self.assertEqual(claim_job(), low)
+        self.assertIsNone(claim_job())
+
+    @override_settings(JOB_RETRY_DELAY=60)
+    def test_failed_job_is_retried_then_fails(self):
+        job = Job.objects.create(task='tests.echo', payload={'fail': True},
+                                 max_attempts=2)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.error, 'ValueError: Broken.')
+        self.assertGreater(job.run_at,
+                           timezone.now() + timedelta(seconds=50))
+        self.assertIsNone(claim_job())
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_expired_lease_is_taken_again(self):
+        job = enqueue('tests.echo')
+        claim_job()
+        self.assertIsNone(claim_job())
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_job(), job)
+
+    def test_abandoned_last_attempt_fails(self):
+        job = Job.objects.create(task='tests.echo', max_attempts=1)
+        claim_job()
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIsNotNone(job.finished_at)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_expired_jobs_are_purged_with_their_files(self):
+        now = timezone.now()
+        files = [default_storage.save(f'jobs/{name}.pdf', ContentFile(b'%'))
+                 for name in ('old', 'kept', 'orphan')]
+        old, kept = (
+            Job.objects.create(task='tests.echo', status=Job.DONE,
+                               result={'file': name}, finished_at=finished)
+            for name, finished in ((files[0], now - timedelta(days=1)),
+                                   (files[1], now + timedelta(days=1)))
+        )
+        self.assertEqual(purge_expired_jobs(now + timedelta(seconds=1)), 1)
+        self.assertQuerysetEqual(Job.objects.all(), [kept])
+        self.assertEqual([default_storage.exists(name) for name in files],
+                         [False, True, False])
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue('tests.unknown')
+        self.assertIn('recipes.image_variants', TASKS)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class JobTasksTestCase(TransactionTestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _run_jobs(self):
+        call_command('run_jobs', burst=True, concurrency=1,
+                     stdout=StringIO())
+
+    def test_image_variants_job(self):
+        buffer = BytesIO()
+        Image.new('RGB', (600, 300), 'red').save(buffer, 'PNG')
+        recipe = Recipe.objects.create(
+            author=self.user, name='Borsch', text='Cook it', cooking_time=60,
+            image=SimpleUploadedFile('borsch.png', buffer.getvalue()),
+        )
+        schedule_image_variants(recipe)
+        with override_settings(RECIPE_IMAGE_SIZES={'card': 480}):
+            self._run_jobs()
+        recipe.refresh_from_db()
+        self.assertEqual(set(recipe.image_variants), {'card'})
+
+    @mock.patch('recipes.helpers.pdfkit.from_string',
+                return_value=b'%PDF-1.4')
+    def test_shopping_cart_pdf_job(self, from_string):
+        url = '/api/recipes/download_shopping_cart/'
+        response = self.client.get(url, HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Job.PENDING)
+        self.assertIsNone(response.data['result_url'])
+        job_url = response['Location']
+        self._run_jobs()
+        response = self.client.get(job_url)
+        self.assertEqual(response.data['status'], Job.DONE)
+        response = self.client.get(response.data['result_url'])
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertIn('shopping_list.pdf', response['Content-Disposition'])
+
+        other = APIClient()
+        other.force_authenticate(
+            User.objects.create_user(username='other', email='o@mail.ru')
+        )
+        self.assertEqual(other.get(job_url).status_code, 404)
+
+    def test_delete_user_in_background(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='secret'
+        )
+        recipes = [Recipe.objects.create(author=self.user, name=f'Soup {n}',
+                                         text='Boil', cooking_time=30)
+                   for n in range(3)]
+        Favorite.objects.create(owner=admin, recipe=recipes[0])
+        ShoppingCart.objects.create(owner=self.user, recipe=recipes[1])
+        Follow.objects.create(user=admin, following=self.user)
+        self.client.force_login(admin)
+        response = self.client.post('/admin/users/user/', {
+            'action': 'delete_in_background',
+            '_selected_action': [self.user.pk, admin.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(Recipe.all_objects.count(), 3)
+        self.assertEqual(Job.objects.get().owner, admin)
+        with override_settings(PURGE_BATCH_SIZE=2):
+            self._run_jobs()
+        self.assertFalse(User.all_objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Recipe.all_objects.exists())
+        self.assertFalse(Favorite.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.progress, {'done': 3, 'total': 3})
+
+    def test_delete_recipe_in_background(self):
+        recipe = Recipe.objects.create(author=self.user, name='Soup',
+                                       text='Boil', cooking_time=30)
+        RecipeIngredient.objects.create(
+            recipe=recipe, amount=5,
+            ingredient=Ingredient.objects.create(name='salt',
+                                                 measurement_unit='g'),
+        )
+        ShoppingCart.objects.create(owner=self.user, recipe=recipe)
+        response = self.client.delete(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get(f'/api/recipes/{recipe.pk}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            RecipeChange.objects.filter(recipe_id=recipe.pk).last().action,
+            RecipeChange.DELETE,
+        )
+        self._run_jobs()
+        self.assertFalse(Recipe.all_objects.exists())
+        self.assertFalse(RecipeIngredient.objects.exists())
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertEqual(Job.objects.get().progress, {'done': 1, 'total': 1})
+
+    @override_settings(RECIPE_CHANGES_BATCH_SIZE=2)
+    def test_tag_changes_are_logged_by_a_job(self):
+        tag = Tag.objects.create(name='Lunch', color='#49B64E', slug='lunch')
+        recipes = [
+            Recipe.objects.create(author=self.user, name=f'Recipe {number}',
+                                  text='Mix', cooking_time=5)
+            for number in range(3)
+        ]
+        tag.recipes.set(recipes)
+        changes = RecipeChange.objects.count()
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(RecipeChange.objects.count(), changes)
+        self._run_jobs()
+        self.assertEqual(RecipeChange.objects.count(), changes + 3)
+        self.assertEqual(Job.objects.get().progress, {'done': 3, 'total': 3})
+        tag.delete()
+        self._run_jobs()
+        self.assertEqual(RecipeChange.objects.count(), changes + 6)
@@ -1,46 +1,81 @@
-from django.contrib.admin import ModelAdmin, TabularInline, register
+from django.contrib import messages
+from django.contrib.admin import (ModelAdmin, TabularInline, action, display,
+                                  register)
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from foodgram.admin import AutocompleteFilter, ScalableModelAdmin
+
+from .deletion import soft_delete_recipes
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Tag)
 
 
 @register(Ingredient)
-class IngredientAdmin(ModelAdmin):
-    search_fields = ('name',)
+class IngredientAdmin(ScalableModelAdmin):
+    search_fields = ('^name',)
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
-    empty_value_display = '-empty-'
+    list_filter = ('measurement_unit',)
 
 
 class RecipeIngredientInline(TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
     min_num = 1
     extra = 1
 
 
 @register(Recipe)
-class RecipeAdmin(ModelAdmin):
-    search_fields = ('name',)
-    list_display = ('pk', 'name', 'author')
-    list_filter = ('name', 'author', 'tags')
+class RecipeAdmin(ScalableModelAdmin):
+    search_fields = ('^name',)
+    list_display = ('pk', 'name', 'author', 'favorites_count')
+    list_filter = (('author', AutocompleteFilter), 'tags')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInline,)
-    empty_value_display = '-empty-'
+    actions = ('delete_in_background',)
 
+    def get_queryset(self, request):
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(favorites), 0)
+        )
 
-@register(Favorite)
-class FavoriteAdmin(ModelAdmin):
-    search_fields = ('owner', 'recipe')
+    @display(description='Favorites', ordering='favorites_count')
+    def favorites_count(self, recipe):
+        return recipe.favorites_count
+
+    @action(description='Delete in the background', permissions=('delete',))
+    def delete_in_background(self, request, queryset):
+        """Hide the recipes now and queue the deletion of their rows."""
+        recipe_ids = list(queryset.values_list('pk', flat=True))
+        soft_delete_recipes(recipe_ids, owner=request.user)
+        self.message_user(request,
+                          f'{len(recipe_ids)} recipes will be deleted.',
+                          messages.SUCCESS)
+
+
+class RecipeListAdmin(ScalableModelAdmin):
+    search_fields = ('^owner__username', '^recipe__name')
     list_display = ('pk', 'owner', 'recipe')
-    list_filter = ('owner', 'recipe')
-    empty_value_display = '-empty-'
+    list_filter = (('owner', AutocompleteFilter),
+                   ('recipe', AutocompleteFilter))
+    list_select_related = ('owner', 'recipe')
+    autocomplete_fields = ('owner', 'recipe')
+
+
+@register(Favorite)
+class FavoriteAdmin(RecipeListAdmin):
+    pass
 
 
 @register(ShoppingCart)
-class ShoppingCartAdmin(ModelAdmin):
-    search_fields = ('owner', 'recipe')
-    list_display = ('pk', 'owner', 'recipe')
-    list_filter = ('owner', 'recipe')
-    empty_value_display = '-empty-'
+class ShoppingCartAdmin(RecipeListAdmin):
+    pass
 
 
 @register(Tag)
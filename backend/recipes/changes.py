@@ -0,0 +1,134 @@
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, models, router
+from django.db.models import Func, Q
+
+from jobs.models import Job
+from jobs.queue import MAINTENANCE, enqueue, report_progress
+from recipes.models import Recipe, RecipeChange
+
+LOG_TAG_CHANGES_TASK = 'recipes.log_tag_changes'
+
+
+class CurrentTransactionId(Func):
+    """Id of the running transaction, on PostgreSQL 13 and later."""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class SnapshotXmin(Func):
+    """Id of the oldest transaction still running, on PostgreSQL 13+.
+
+    Every transaction with a lower id has committed or rolled back.
+    """
+    template = 'pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+def log_recipe_changes(recipe_ids: Iterable[int],
+                       action: str = RecipeChange.UPSERT) -> None:
+    """Log changes of the recipes, along with the writing transaction.
+
+    Only PostgreSQL records the transaction; other databases, such as
+    the SQLite of the tests, write one transaction at a time, so entry
+    ids are already in commit order there.
+    """
+    database = router.db_for_write(RecipeChange)
+    transaction_id = (CurrentTransactionId()
+                      if connections[database].vendor == 'postgresql'
+                      else 0)
+    RecipeChange.objects.using(database).bulk_create(
+        RecipeChange(recipe_id=recipe_id, action=action,
+                     transaction_id=transaction_id)
+        for recipe_id in recipe_ids
+    )
+
+
+def schedule_tag_changes(tag_id: Optional[int] = None,
+                         recipe_ids: Optional[List[int]] = None) -> Job:
+    """Queue logging changes of the recipes of a tag, or of ``recipe_ids``.
+
+    A tag may be on most of the catalogue, so its recipes are logged by
+    a job rather than in the request changing it.
+    """
+    return enqueue(LOG_TAG_CHANGES_TASK,
+                   {'tag_id': tag_id, 'recipe_ids': recipe_ids},
+                   priority=MAINTENANCE)
+
+
+def log_tag_changes(tag_id: Optional[int] = None,
+                    recipe_ids: Optional[List[int]] = None) -> int:
+    """Log changes of the recipes now carrying the tag, or ``recipe_ids``.
+
+    They are written ``RECIPE_CHANGES_BATCH_SIZE`` at a time, with
+    progress reported in recipes. Returns the number logged.
+    """
+    batch_size = settings.RECIPE_CHANGES_BATCH_SIZE
+    if recipe_ids is None:
+        recipe_ids = list(Recipe.tags.through.objects.filter(
+            tag_id=tag_id
+        ).values_list('recipe_id', flat=True))
+    total = len(recipe_ids)
+    for start in range(0, total, batch_size):
+        log_recipe_changes(recipe_ids[start:start + batch_size])
+        report_progress(min(start + batch_size, total), total)
+    return total
+
+
+class ChangesPage(NamedTuple):
+    cursor: str
+    upserted: List[int]
+    deleted: List[int]
+    has_more: bool
+
+
+def format_cursor(transaction_id: int, entry_id: int) -> str:
+    if not transaction_id:
+        return str(entry_id)
+    return f'{transaction_id}.{entry_id}'
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """The transaction and entry ids of a cursor of ``read_changes``.
+
+    A bare entry id, as given for entries without a transaction, has
+    transaction 0.
+    """
+    transaction_id, _, entry_id = cursor.rpartition('.')
+    return int(transaction_id or 0), int(entry_id)
+
+
+def read_changes(since: str, limit: int) -> ChangesPage:
+    """Return up to ``limit`` change-log entries after the ``since`` cursor.
+
+    Entries of the same recipe collapse into the latest one. They are
+    read in the order of their transactions, and on PostgreSQL only
+    those of transactions older than every running one are: a running
+    transaction could still commit entries, and ids are taken at insert
+    time, so the cursor must not pass them.
+    """
+    transaction_id, entry_id = parse_cursor(since)
+    entries = RecipeChange.objects.filter(
+        Q(transaction_id=transaction_id, id__gt=entry_id)
+        | Q(transaction_id__gt=transaction_id)
+    )
+    if connections[entries.db].vendor == 'postgresql':
+        entries = entries.filter(transaction_id__lt=SnapshotXmin())
+    entries = list(entries.order_by('transaction_id', 'id').values_list(
+        'transaction_id', 'id', 'recipe_id', 'action'
+    )[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    actions = {}
+    for _, _, recipe_id, action in entries:
+        actions.pop(recipe_id, None)
+        actions[recipe_id] = action
+    return ChangesPage(
+        cursor=format_cursor(*entries[-1][:2]) if entries else since,
+        upserted=[recipe_id for recipe_id, action in actions.items()
+                  if action == RecipeChange.UPSERT],
+        deleted=[recipe_id for recipe_id, action in actions.items()
+                 if action == RecipeChange.DELETE],
+        has_more=has_more,
+    )
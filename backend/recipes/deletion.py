@@ -0,0 +1,68 @@
+from functools import partial
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram.cache import RECIPE_LIST_TAG, invalidate_recipes, invalidate_tags
+from foodgram.db.deletion import delete_in_batches
+from jobs.models import Job
+from jobs.queue import MAINTENANCE, enqueue, report_progress
+from recipes.changes import log_recipe_changes
+from recipes.models import (Favorite, Recipe, RecipeChange, RecipeIngredient,
+                            ShoppingCart)
+
+PURGE_RECIPES_TASK = 'recipes.purge_recipes'
+
+
+def hide_recipes(recipes) -> List[int]:
+    """Mark the recipes deleted, so they are left out at once.
+
+    They leave the change feed and the cached responses as if deleted.
+    Returns their ids.
+    """
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        is_deleted=True, updated_at=timezone.now()
+    )
+    log_recipe_changes(recipe_ids, RecipeChange.DELETE)
+    transaction.on_commit(partial(invalidate_recipes, recipe_ids))
+    transaction.on_commit(partial(invalidate_tags, (RECIPE_LIST_TAG,)))
+    return recipe_ids
+
+
+def soft_delete_recipes(recipe_ids: Iterable[int],
+                        owner=None) -> Optional[Job]:
+    """Hide the recipes and queue the job purging their rows."""
+    recipe_ids = hide_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+    if not recipe_ids:
+        return None
+    return enqueue(PURGE_RECIPES_TASK, {'recipe_ids': recipe_ids},
+                   owner=owner, priority=MAINTENANCE)
+
+
+def purge_recipes(recipes) -> int:
+    """Delete hidden recipes with their rows, ``PURGE_BATCH_SIZE`` at a time.
+
+    Favorites, shopping carts, ingredients and tags of a batch of recipes
+    go first, in batches of plain deletes, then the recipes themselves;
+    nothing is loaded into Python and no lock is held for long. Progress
+    is reported in recipes. Returns the number of recipes deleted.
+    """
+    batch_size = settings.PURGE_BATCH_SIZE
+    total = recipes.count()
+    done = 0
+    while True:
+        recipe_ids = list(recipes.values_list('pk', flat=True)[:batch_size])
+        if not recipe_ids:
+            return done
+        for model in (Favorite, ShoppingCart, RecipeIngredient,
+                      Recipe.tags.through):
+            delete_in_batches(
+                model.objects.filter(recipe_id__in=recipe_ids), batch_size
+            )
+        done += delete_in_batches(
+            Recipe.all_objects.filter(pk__in=recipe_ids), batch_size
+        )
+        report_progress(done, total)
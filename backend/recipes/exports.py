@@ -0,0 +1,106 @@
+import csv
+import json
+from typing import Callable, Dict, Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+
+from recipes.models import Recipe
+
+CSV_COLUMNS = ('id', 'name', 'text', 'cooking_time', 'image', 'pub_date',
+               'updated_at', 'author_id', 'author_username', 'tags',
+               'ingredients')
+
+
+def iter_recipes(chunk_size: int = settings.EXPORT_CHUNK_SIZE
+                 ) -> Iterator[Recipe]:
+    """Every recipe with its author, tags and ingredients.
+
+    Recipes are read through a server-side cursor ``chunk_size`` at a
+    time, and the relations of each chunk are prefetched before it is
+    handed out, so memory use does not grow with the catalogue.
+    """
+    recipes = Recipe.objects.select_related('author').order_by('pk')
+    chunk = []
+    for recipe in recipes.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield from _prefetched_chunk(chunk)
+            chunk = []
+    yield from _prefetched_chunk(chunk)
+
+
+def _prefetched_chunk(chunk: list) -> list:
+    prefetch_related_objects(chunk, 'tags', 'recipe_ingredient__ingredient')
+    return chunk
+
+
+def export_record(recipe: Recipe) -> dict:
+    return {
+        'id': recipe.pk,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': recipe.image.name if recipe.image else None,
+        'pub_date': recipe.pub_date,
+        'updated_at': recipe.updated_at,
+        'author': {
+            'id': recipe.author.pk,
+            'username': recipe.author.username,
+            'first_name': recipe.author.first_name,
+            'last_name': recipe.author.last_name,
+        },
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'id': item.ingredient.pk,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredient.all()
+        ],
+    }
+
+
+def _to_json(value) -> str:
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def iter_jsonl(recipes: Iterable[Recipe]) -> Iterator[str]:
+    for recipe in recipes:
+        yield _to_json(export_record(recipe)) + '\n'
+
+
+class _Echo:
+    """A file-like object giving back what ``csv.writer`` writes to it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(recipes: Iterable[Recipe]) -> Iterator[str]:
+    """One row per recipe; tags and ingredients are JSON arrays."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for recipe in recipes:
+        record = export_record(recipe)
+        author = record.pop('author')
+        yield writer.writerow((
+            record['id'], record['name'], record['text'],
+            record['cooking_time'], record['image'],
+            record['pub_date'].isoformat(), record['updated_at'].isoformat(),
+            author['id'], author['username'], _to_json(record['tags']),
+            _to_json(record['ingredients']),
+        ))
+
+
+EXPORT_FORMATS: Dict[str, Callable[[Iterable[Recipe]], Iterator[str]]] = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+}
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
@@ -71,9 +71,13 @@ class FavoriteCreateDelete:
 
 
 class ShoppingCartToPDF:
+    FILENAME: str = 'shopping_list.pdf'
 
-    def generate_pdf(self, request):
-        recipes_in_shopping_cart = request.user.shopping_cart.values('recipe')
+    @staticmethod
+    def render(user: User) -> bytes:
+        recipes_in_shopping_cart = user.shopping_cart.filter(
+            recipe__is_deleted=False
+        ).values('recipe')
         unique_ingredients = RecipeIngredient.objects.filter(
             recipe__in=recipes_in_shopping_cart
         ).values(
@@ -85,7 +89,9 @@ class ShoppingCartToPDF:
             'page-size': 'Letter',
             'encoding': "UTF-8",
         }
-        pdf = pdfkit.from_string(html, False, options)
-        buffer = BytesIO(pdf)
-        return FileResponse(buffer, filename='shopping_list.pdf',
+        return pdfkit.from_string(html, False, options)
+
+    def generate_pdf(self, request):
+        buffer = BytesIO(self.render(request.user))
+        return FileResponse(buffer, filename=self.FILENAME,
                             content_type='application/pdf')
@@ -0,0 +1,93 @@
+import logging
+import posixpath
+from io import BytesIO
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from foodgram.cache import invalidate_recipes
+from jobs.queue import enqueue
+from recipes.changes import log_recipe_changes
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS_TASK = 'recipes.image_variants'
+VARIANTS_DIR = 'recipes/images/variants'
+FORMAT_EXTENSIONS = {
+    'avif': 'avif',
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+
+
+def get_image_formats() -> List[str]:
+    """Return the output formats Pillow can write, best compression first."""
+    Image.init()
+    return [image_format for image_format in FORMAT_EXTENSIONS
+            if image_format.upper() in Image.SAVE]
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    if image_format == 'jpeg' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A')
+                         if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format.upper(),
+               quality=settings.RECIPE_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def build_image_variants(name: str) -> Dict[str, Dict[str, str]]:
+    """Store resized copies of the image, keyed by size and format."""
+    with recipe_image_storage.open(name) as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    variants = {}
+    for size, width in settings.RECIPE_IMAGE_SIZES.items():
+        image = original.copy()
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        variants[size] = {}
+        for image_format in get_image_formats():
+            path = posixpath.join(
+                VARIANTS_DIR, f'{size}.{FORMAT_EXTENSIONS[image_format]}'
+            )
+            variants[size][image_format] = recipe_image_storage.save(
+                path, ContentFile(_encode(image, image_format))
+            )
+    return variants
+
+
+def save_image_variants(recipe_id: int, name: str) -> None:
+    """Build the variants and store them, unless the image was replaced."""
+    variants = build_image_variants(name)
+    if Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=variants, updated_at=timezone.now()
+    ):
+        log_recipe_changes((recipe_id,))
+        invalidate_recipes((recipe_id,))
+
+
+def update_image_variants(recipe_id: int, name: str) -> None:
+    try:
+        save_image_variants(recipe_id, name)
+    except Exception:
+        logger.exception('Cannot build variants of %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_image_variants(recipe: Recipe) -> None:
+    """Queue a job building the image variants, see ``recipes.tasks``."""
+    if recipe.image:
+        enqueue(IMAGE_VARIANTS_TASK,
+                {'recipe_id': recipe.pk, 'name': recipe.image.name})
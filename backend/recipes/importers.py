@@ -0,0 +1,304 @@
+import json
+from functools import partial
+from itertools import islice
+from multiprocessing.pool import Pool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from rest_framework.exceptions import ValidationError as APIValidationError
+
+from api.serializers import RecipeImageField
+from foodgram.cache import RECIPE_LIST_TAG, invalidate_tags
+from recipes.changes import log_recipe_changes
+from recipes.images import schedule_image_variants
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+NON_FIELD_ERRORS = 'non_field_errors'
+
+
+def read_bundle(file: Iterable, after: int = 0) -> Iterator[Tuple[int, str]]:
+    """Number the non-blank lines of a JSON Lines bundle.
+
+    Lines up to ``after``, the checkpoint of an interrupted import, are
+    skipped.
+    """
+    for number, line in enumerate(file, 1):
+        if number > after and line.strip():
+            yield number, line
+
+
+def store_image(data: str) -> Tuple[Optional[str], Optional[str]]:
+    """Decode and store a base64 image: the stored name or an error."""
+    try:
+        image = RecipeImageField().to_internal_value(data)
+    except APIValidationError as error:
+        return None, ' '.join(map(str, error.detail))
+    field = Recipe._meta.get_field('image')
+    return field.storage.save(field.generate_filename(None, image.name),
+                              image), None
+
+
+class RecordError(NamedTuple):
+    line: int
+    errors: Dict[str, List[str]]
+
+
+class ImportResult(NamedTuple):
+    """One written batch; ``line`` is the checkpoint to resume after."""
+    line: int
+    created: List[int]
+    errors: List[RecordError]
+
+
+class PlannedRecipe(NamedTuple):
+    line: int
+    fields: dict
+    tag_ids: List[int]
+    ingredients: List[Tuple[int, int]]
+    image: Optional[str]
+
+
+class RecipeImporter:
+    """Create recipes of one author from JSON Lines records in batches.
+
+    A record has the ``name``, ``text``, ``cooking_time`` and base64
+    ``image`` of ``RecipeCreateSerializer``; ``tags`` are slugs or ids
+    and each of the ``ingredients`` has an ``amount`` and either an
+    ``id`` or a ``name`` with a ``measurement_unit``. Tags and
+    ingredients are resolved against lookups cached for the whole
+    import, so a batch costs at most two ingredient queries.
+
+    Invalid records are reported with their line numbers and skipped.
+    Images are decoded and stored in a process pool of ``workers``
+    processes while the previous batch is written; each batch is written
+    in one transaction with ``bulk_create``, logged in the change feed
+    and drops the cached recipe lists.
+    """
+
+    def __init__(self, author, batch_size: int, workers: int = 1) -> None:
+        self.author = author
+        self.batch_size: int = batch_size
+        self.workers: int = workers
+        self.pool: Optional[Pool] = None
+        self.tags: Dict[object, int] = {}
+        self.ingredient_ids: Dict[int, bool] = {}
+        self.ingredient_names: Dict[Tuple[str, str], Optional[int]] = {}
+
+    def __enter__(self) -> 'RecipeImporter':
+        if self.workers > 1:
+            self.pool = Pool(self.workers, initializer=django.setup)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+
+    def load(self, lines: Iterable[Tuple[int, str]]
+             ) -> Iterator[ImportResult]:
+        lines = iter(lines)
+        self.tags = {}
+        for pk, slug in Tag.objects.values_list('pk', 'slug'):
+            self.tags[pk] = self.tags[slug] = pk
+        pending = None
+        while True:
+            batch = list(islice(lines, self.batch_size))
+            planned = self._plan(batch) if batch else None
+            if pending:
+                yield self._write(*pending)
+            if not planned:
+                return
+            pending = planned
+
+    def _plan(self, batch: List[Tuple[int, str]]) -> tuple:
+        records, errors = [], []
+        for line, text in batch:
+            try:
+                record = json.loads(text)
+                if not isinstance(record, dict):
+                    raise ValueError('A JSON object is expected.')
+            except ValueError as error:
+                errors.append(RecordError(line, {NON_FIELD_ERRORS:
+                                                 [str(error)]}))
+            else:
+                records.append((line, record))
+        self._load_ingredients(record for _, record in records)
+        planned = []
+        for line, record in records:
+            try:
+                planned.append(self._clean(line, record))
+            except ValidationError as error:
+                errors.append(RecordError(line, error.message_dict))
+        images = [recipe.image for recipe in planned if recipe.image]
+        if self.pool:
+            images = self.pool.map_async(store_image, images)
+        else:
+            images = list(map(store_image, images))
+        return batch[-1][0], planned, images, errors
+
+    def _load_ingredients(self, records: Iterable[dict]) -> None:
+        ids, names = set(), set()
+        for record in records:
+            for item in self._ingredient_items(record):
+                if isinstance(item.get('id'), int):
+                    ids.add(item['id'])
+                elif 'id' not in item and self._ingredient_name(item):
+                    names.add(self._ingredient_name(item))
+        ids -= self.ingredient_ids.keys()
+        names -= self.ingredient_names.keys()
+        if ids:
+            found = set(Ingredient.objects.filter(
+                pk__in=ids
+            ).values_list('pk', flat=True))
+            self.ingredient_ids.update((pk, pk in found) for pk in ids)
+        if names:
+            self.ingredient_names.update(dict.fromkeys(names))
+            self.ingredient_names.update(
+                ((name, unit), pk) for pk, name, unit
+                in Ingredient.objects.filter(
+                    name__in={name for name, _ in names}
+                ).values_list('pk', 'name', 'measurement_unit')
+                if (name, unit) in names
+            )
+
+    @staticmethod
+    def _ingredient_items(record: dict) -> list:
+        items = record.get('ingredients')
+        if not isinstance(items, list):
+            return []
+        return [item for item in items if isinstance(item, dict)]
+
+    def _clean(self, line: int, record: dict) -> PlannedRecipe:
+        errors = {}
+        fields = self._clean_fields(record, errors)
+        tag_ids = self._clean_tags(record, errors)
+        ingredients = self._clean_ingredients(record, errors)
+        image = record.get('image')
+        if image is not None and not isinstance(image, str):
+            errors['image'] = ['A base64 string is expected.']
+        if errors:
+            raise ValidationError(errors)
+        return PlannedRecipe(line, fields, tag_ids, ingredients, image)
+
+    @staticmethod
+    def _clean_fields(record: dict, errors: dict) -> dict:
+        fields = {}
+        for name in ('name', 'text', 'cooking_time'):
+            try:
+                fields[name] = Recipe._meta.get_field(name).clean(
+                    record.get(name), None
+                )
+            except ValidationError as error:
+                errors[name] = error.messages
+        if fields.get('cooking_time', settings.MIN_VALUE) > settings.MAX_VALUE:
+            errors['cooking_time'] = [
+                f'Ensure this value is less than or equal to '
+                f'{settings.MAX_VALUE}.'
+            ]
+        return fields
+
+    def _clean_tags(self, record: dict, errors: dict) -> List[int]:
+        tags = record.get('tags', [])
+        if not isinstance(tags, list):
+            errors['tags'] = ['A list of tag slugs or ids is expected.']
+            return []
+        unknown = [tag for tag in tags
+                   if not isinstance(tag, (int, str)) or tag not in self.tags]
+        if unknown:
+            errors['tags'] = [f'Unknown tags: {unknown}.']
+        return sorted({self.tags[tag] for tag in tags if tag in self.tags})
+
+    def _clean_ingredients(self, record: dict,
+                           errors: dict) -> List[Tuple[int, int]]:
+        items = record.get('ingredients', [])
+        if (not isinstance(items, list)
+                or len(self._ingredient_items(record)) != len(items)):
+            errors['ingredients'] = ['A list of objects is expected.']
+            return []
+        ingredients, messages = {}, []
+        for number, item in enumerate(items, 1):
+            pk, amount = self._ingredient_id(item), item.get('amount')
+            if pk is None:
+                messages.append(f'Ingredient {number} is unknown.')
+            elif pk in ingredients:
+                messages.append('Ingredients must be unique')
+            elif (not isinstance(amount, int)
+                  or not settings.MIN_VALUE <= amount <= settings.MAX_VALUE):
+                messages.append(
+                    f'The amount of ingredient {number} must be an integer '
+                    f'from {settings.MIN_VALUE} to {settings.MAX_VALUE}.'
+                )
+            else:
+                ingredients[pk] = amount
+        if messages:
+            errors['ingredients'] = messages
+        return list(ingredients.items())
+
+    def _ingredient_id(self, item: dict) -> Optional[int]:
+        if 'id' in item:
+            pk = item['id']
+            if isinstance(pk, int) and self.ingredient_ids.get(pk):
+                return pk
+            return None
+        return self.ingredient_names.get(self._ingredient_name(item))
+
+    @staticmethod
+    def _ingredient_name(item: dict) -> Optional[Tuple[str, str]]:
+        name, unit = item.get('name'), item.get('measurement_unit')
+        if isinstance(name, str) and isinstance(unit, str):
+            return name, unit
+        return None
+
+    @transaction.atomic
+    def _write(self, line: int, planned: List[PlannedRecipe], images,
+               errors: List[RecordError]) -> ImportResult:
+        images = iter(images if isinstance(images, list) else images.get())
+        recipes, written = [], []
+        for item in planned:
+            image = None
+            if item.image:
+                image, error = next(images)
+                if error:
+                    errors.append(RecordError(item.line, {'image': [error]}))
+                    continue
+            recipes.append(Recipe(author=self.author, image=image,
+                                  **item.fields))
+            written.append(item)
+        self._insert(recipes)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, item in zip(recipes, written)
+            for tag_id in item.tag_ids
+        ], batch_size=self.batch_size)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe_id=recipe.pk, ingredient_id=pk,
+                             amount=amount)
+            for recipe, item in zip(recipes, written)
+            for pk, amount in item.ingredients
+        ], batch_size=self.batch_size)
+        for recipe in recipes:
+            schedule_image_variants(recipe)
+        errors.sort()
+        return ImportResult(line, [recipe.pk for recipe in recipes], errors)
+
+    def _insert(self, recipes: List[Recipe]) -> None:
+        """Insert the recipes, setting their primary keys.
+
+        Databases that cannot return the keys of a bulk insert, such as
+        SQLite, get one insert per recipe, whose signals log the change
+        and drop the cached lists.
+        """
+        features = connections[router.db_for_write(Recipe)].features
+        if not features.can_return_rows_from_bulk_insert:
+            for recipe in recipes:
+                recipe.save()
+            return
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        recipe_ids = [recipe.pk for recipe in recipes]
+        log_recipe_changes(recipe_ids)
+        if recipe_ids:
+            transaction.on_commit(partial(invalidate_tags,
+                                          (RECIPE_LIST_TAG,)))
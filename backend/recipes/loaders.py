@@ -0,0 +1,244 @@
+import csv
+import json
+from itertools import islice
+from multiprocessing.pool import Pool
+from typing import (Callable, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Sequence, TextIO, Tuple)
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (UNUSABLE_PASSWORD_PREFIX,
+                                         identify_hasher, make_password)
+from django.db import models, transaction
+
+from recipes.models import Ingredient, Tag
+
+User = get_user_model()
+
+READ_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = ' \t\r\n,'
+
+
+def read_json_array(file: TextIO,
+                    chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the items of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = chunk = file.read(chunk_size)
+    while chunk and not buffer.strip():
+        chunk = file.read(chunk_size)
+        buffer += chunk
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('A JSON array is expected.')
+    buffer = buffer[1:]
+    while chunk:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip(JSON_SEPARATORS)
+            if buffer.startswith(']'):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            yield record
+            buffer = buffer[end:]
+    raise ValueError('Unexpected end of the JSON array.')
+
+
+def read_json_lines(file: TextIO) -> Iterator[dict]:
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_csv(file: TextIO, fieldnames: Sequence[str]) -> Iterator[dict]:
+    """Yield CSV rows as dicts, skipping a header equal to ``fieldnames``."""
+    reader = csv.reader(file)
+    for row in reader:
+        if reader.line_num == 1 and row == list(fieldnames):
+            continue
+        if row:
+            yield dict(zip(fieldnames, row))
+
+
+class LoadSpec(NamedTuple):
+    """How records of one kind are matched and written."""
+    model: type
+    fields: Tuple[str, ...]
+    unique_fields: Tuple[str, ...]
+    update_fields: Tuple[str, ...]
+    prepare: Optional[Callable[[dict], dict]] = None
+
+
+def is_password_hashed(password: str) -> bool:
+    if password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return True
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_password(record: dict) -> dict:
+    """Hash a plain-text password, keeping already hashed ones as they are."""
+    if not is_password_hashed(record['password']):
+        record['password'] = make_password(record['password'])
+    return record
+
+
+LOAD_SPECS: Dict[str, LoadSpec] = {
+    'tags': LoadSpec(
+        model=Tag,
+        fields=('name', 'color', 'slug'),
+        unique_fields=('slug',),
+        update_fields=('name', 'color'),
+    ),
+    'ingredients': LoadSpec(
+        model=Ingredient,
+        fields=('name', 'measurement_unit'),
+        unique_fields=('name', 'measurement_unit'),
+        update_fields=(),
+    ),
+    'users': LoadSpec(
+        model=User,
+        fields=('email', 'username', 'first_name', 'last_name', 'password'),
+        unique_fields=('email',),
+        update_fields=(),
+        prepare=hash_password,
+    ),
+}
+
+
+def guess_spec_name(record: dict) -> str:
+    if 'color' in record:
+        return 'tags'
+    if 'measurement_unit' in record:
+        return 'ingredients'
+    if 'email' in record:
+        return 'users'
+    raise ValueError(f'Unknown record: {record}')
+
+
+class BatchResult(NamedTuple):
+    rows: int
+    created: int
+    updated: int
+
+
+class BulkUpsertLoader:
+    """Insert-or-update records in batches, keyed by ``spec.unique_fields``.
+
+    Existing rows are looked up with one query per batch, new rows go
+    through ``bulk_create`` and changed rows through ``bulk_update``, so
+    loading the same file again is a no-op. A key repeated in the batch
+    after the one creating it becomes an update, looked up once that
+    batch is written.
+
+    New records pass through ``spec.prepare`` in a process pool of
+    ``workers`` processes. The next batch is prepared while the current
+    one is written, so CPU-heavy preparation such as password hashing
+    uses every core.
+    """
+
+    def __init__(self, spec: LoadSpec, batch_size: int,
+                 workers: int = 1) -> None:
+        self.spec: LoadSpec = spec
+        self.batch_size: int = batch_size
+        self.workers: int = workers
+        self.pool: Optional[Pool] = None
+
+    def __enter__(self) -> 'BulkUpsertLoader':
+        if self.spec.prepare and self.workers > 1:
+            self.pool = Pool(self.workers, initializer=django.setup)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+
+    def load(self, records: Iterable[dict]) -> Iterator[BatchResult]:
+        records = iter(records)
+        pending = None
+        while True:
+            batch = list(islice(records, self.batch_size))
+            unwritten = pending[-1] if pending else frozenset()
+            planned = self._plan(batch, unwritten) if batch else None
+            if pending:
+                yield self._write(*pending)
+            if not planned:
+                return
+            pending = planned
+
+    def _plan(self, records: List[dict], unwritten: frozenset) -> tuple:
+        """Plan the writes of a batch.
+
+        ``unwritten`` are the keys the batch before creates; as it is not
+        written yet, repeats of them are looked up in ``_write``.
+        """
+        unique_records = {}
+        for record in records:
+            record = {field: record[field] for field in self.spec.fields}
+            unique_records[self._key(record)] = record
+        existing = self._existing(unique_records)
+        late = {key: record for key, record in unique_records.items()
+                if key in unwritten and key not in existing}
+        new_records = [record for key, record in unique_records.items()
+                       if key not in existing and key not in late]
+        new_keys = frozenset(map(self._key, new_records))
+        if self.spec.prepare and self.pool:
+            chunk_size = max(1, len(new_records) // (self.workers * 4))
+            new_records = self.pool.map_async(self.spec.prepare, new_records,
+                                              chunk_size)
+        elif self.spec.prepare:
+            new_records = list(map(self.spec.prepare, new_records))
+        changed = self._changed(existing, unique_records)
+        return len(records), new_records, changed, late, new_keys
+
+    def _changed(self, existing: Dict[tuple, models.Model],
+                 records: Dict[tuple, dict]) -> List[models.Model]:
+        changed = []
+        for key, obj in existing.items():
+            record = records[key]
+            if any(getattr(obj, field) != record[field]
+                   for field in self.spec.update_fields):
+                for field in self.spec.update_fields:
+                    setattr(obj, field, record[field])
+                changed.append(obj)
+        return changed
+
+    @transaction.atomic
+    def _write(self, rows: int, new_records, changed: List,
+               late: Dict[tuple, dict], new_keys: frozenset) -> BatchResult:
+        if not isinstance(new_records, list):
+            new_records = new_records.get()
+        if late:
+            changed += self._changed(self._existing(late), late)
+        self.spec.model.objects.bulk_create(
+            (self.spec.model(**record) for record in new_records),
+            ignore_conflicts=True,
+        )
+        if changed:
+            self.spec.model.objects.bulk_update(changed,
+                                                self.spec.update_fields)
+        return BatchResult(rows, len(new_records), len(changed))
+
+    def _key(self, record) -> tuple:
+        return tuple(record[field] for field in self.spec.unique_fields)
+
+    def _existing(self,
+                  records: Dict[tuple, dict]) -> Dict[tuple, models.Model]:
+        first_field = self.spec.unique_fields[0]
+        queryset = self.spec.model.objects.filter(**{
+            f'{first_field}__in': {key[0] for key in records}
+        })
+        existing = {}
+        for obj in queryset:
+            key = self._key(obj.__dict__)
+            if key in records:
+                existing[key] = obj
+        return existing
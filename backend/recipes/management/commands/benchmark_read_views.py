@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+from users.models import User
+
+URLCONFS = {
+    'sync': 'foodgram.urls',
+    'async': 'foodgram.asgi_urls',
+}
+PATHS = (
+    '/api/recipes/?limit=25',
+    '/api/recipes/{recipe_id}/',
+    '/api/ingredients/?name=a',
+    '/api/tags/',
+    '/api/users/subscriptions/?recipes_limit=3',
+)
+
+
+class Command(BaseCommand):
+    help = ('Compare the sync and async read views under the ASGI handler '
+            'with concurrent requests of one signed-in user.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username',
+                            help='user making the requests, the first one '
+                                 'by default')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to make the requests.')
+        recipe = Recipe.objects.first()
+        if recipe is None:
+            raise CommandError('No recipes to request.')
+        token, _ = Token.objects.get_or_create(user=user)
+        for path in PATHS:
+            path = path.format(recipe_id=recipe.pk)
+            for mode, urlconf in URLCONFS.items():
+                with override_settings(ROOT_URLCONF=urlconf):
+                    result = asyncio.run(self._run(
+                        path, f'Token {token.key}', options['requests'],
+                        options['concurrency'],
+                    ))
+                self._report(path, mode, result)
+
+    @staticmethod
+    async def _run(path, authorization, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def fetch():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path,
+                                            authorization=authorization)
+                timings.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{path} answered {response.status_code}.'
+                    )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(requests)))
+        return timings, time.perf_counter() - started
+
+    def _report(self, path, mode, result):
+        timings, elapsed = result
+        quantiles = statistics.quantiles(timings, n=20)
+        self.stdout.write(
+            f'{mode:>5} {path}: {len(timings) / elapsed:.0f} req/s, '
+            f'p50 {quantiles[9] * 1000:.1f} ms, '
+            f'p95 {quantiles[18] * 1000:.1f} ms'
+        )
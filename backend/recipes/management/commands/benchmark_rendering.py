@@ -0,0 +1,58 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+from api.views import RecipeViewSet
+from foodgram.middleware import COMPRESSORS
+from users.models import User
+
+RENDERERS = {
+    'json': JSONRenderer,
+    'orjson': ORJSONRenderer,
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure the CPU time to render and compress a recipe list '
+            'page and its size on the wire.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25,
+                            help='recipes on the page')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        data = self._page_data(options['limit'])
+        if not data['results']:
+            raise CommandError('No recipes to render.')
+        repeat = options['repeat']
+        self.stdout.write(f'{len(data["results"])} recipes, '
+                          f'{repeat} renders each')
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            content, cpu = self._measure(renderer.render, data, repeat)
+            self._report(name, 'identity', len(content), cpu)
+        for encoding, compress in COMPRESSORS.items():
+            compressed, cpu = self._measure(compress, content, repeat)
+            self._report('orjson', encoding, len(compressed), cpu)
+
+    @staticmethod
+    def _page_data(limit):
+        request = RequestFactory().get('/api/recipes/', {'limit': limit})
+        request.user = User.objects.order_by('pk').first()
+        view = RecipeViewSet.as_view({'get': 'list'})
+        return view(request).data
+
+    @staticmethod
+    def _measure(func, value, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            result = func(value)
+        return result, (time.process_time() - started) / repeat
+
+    def _report(self, renderer, encoding, size, cpu):
+        self.stdout.write(f'{renderer:>6} {encoding:>8}: {size} bytes, '
+                          f'{cpu * 1000:.3f} ms CPU')
@@ -0,0 +1,56 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+IMAGES_DIR = 'recipes/images'
+
+
+class Command(BaseCommand):
+    help = ('Delete recipe images and image variants that no recipe '
+            'refers to.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=24 * 60 * 60,
+            help='keep files modified within this many seconds',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        referenced = set()
+        rows = Recipe.objects.exclude(image__isnull=True).exclude(
+            image=''
+        ).values_list('image', 'image_variants').iterator()
+        for image, variants in rows:
+            referenced.add(image)
+            for formats in variants.values():
+                referenced.update(formats.values())
+
+        threshold = timezone.now() - timedelta(seconds=options['grace'])
+        deleted = 0
+        for name in self._walk(IMAGES_DIR):
+            if name in referenced:
+                continue
+            if recipe_image_storage.get_modified_time(name) > threshold:
+                continue
+            self.stdout.write(name)
+            if not options['dry_run']:
+                recipe_image_storage.delete(name)
+            deleted += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} unreferenced files are deleted.'
+        ))
+
+    def _walk(self, directory):
+        if not recipe_image_storage.exists(directory):
+            return
+        directories, files = recipe_image_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self._walk(posixpath.join(directory, name))
@@ -0,0 +1,40 @@
+import sys
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.exports import EXPORT_FORMATS, iter_recipes
+
+
+class Command(BaseCommand):
+    help = ('Export every recipe with its author, tags and ingredients as '
+            'JSON Lines or CSV, written as it is read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS,
+                            default='jsonl')
+        parser.add_argument('--output',
+                            help='file to write, standard output by default')
+        parser.add_argument('--chunk-size', type=int,
+                            default=settings.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = EXPORT_FORMATS[options['format']](
+            iter_recipes(options['chunk_size'])
+        )
+        if options['output'] is None:
+            self._write(lines, sys.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            count = self._write(lines, output)
+        self.stderr.write(self.style.SUCCESS(
+            f'{count} lines are written to {options["output"]}.'
+        ))
+
+    @staticmethod
+    def _write(lines, output) -> int:
+        count = 0
+        for count, line in enumerate(lines, 1):
+            output.write(line)
+        return count
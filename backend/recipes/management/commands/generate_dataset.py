@@ -0,0 +1,295 @@
+import csv
+import io
+import os
+import random
+import time
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+FIRST_NAMES = ('Anna', 'Boris', 'Vera', 'Gleb', 'Daria', 'Egor', 'Zoya',
+               'Ivan', 'Kira', 'Lev', 'Maria', 'Nikita', 'Olga', 'Pavel')
+LAST_NAMES = ('Ivanov', 'Petrov', 'Smirnov', 'Kuznetsov', 'Popov', 'Sokolov',
+              'Lebedev', 'Kozlov', 'Novikov', 'Morozov', 'Volkov', 'Orlov')
+DISHES = ('soup', 'salad', 'pie', 'stew', 'porridge', 'pancakes', 'pasta',
+          'curry', 'casserole', 'omelette', 'risotto', 'dumplings')
+ADJECTIVES = ('Grandma\'s', 'Quick', 'Spicy', 'Summer', 'Winter', 'Light',
+              'Hearty', 'Classic', 'Green', 'Crispy', 'Sweet', 'Smoky')
+PASSWORD = 'generated-password'
+TIME_SPAN = timedelta(days=3 * 365)
+
+
+def skewed(rng, low, high, alpha):
+    """Return an int in [low, high) with a power-law bias towards low."""
+    return low + int((high - low) * rng.random() ** alpha)
+
+
+def generate_users(task):
+    seed, first_id, count = task
+    rng = random.Random(f'{seed}:users:{first_id}')
+    return [
+        (
+            user_id,
+            f'gen{user_id}',
+            f'gen{user_id}@example.com',
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+        )
+        for user_id in range(first_id, first_id + count)
+    ]
+
+
+def generate_recipes(task):
+    (seed, first_id, count, authors, ingredient_ids, tag_ids,
+     now, naive) = task
+    rng = random.Random(f'{seed}:recipes:{first_id}')
+    recipes, ingredients, tags = [], [], []
+    for recipe_id in range(first_id, first_id + count):
+        pub_date = now - TIME_SPAN * rng.random()
+        recipes.append((
+            recipe_id,
+            skewed(rng, *authors, alpha=3),
+            f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} #{recipe_id}',
+            skewed(rng, settings.MIN_VALUE, 240, alpha=2),
+            format_datetime(pub_date, naive),
+            ' '.join(rng.choices(DISHES, k=rng.randint(20, 80))),
+        ))
+        picked = set()
+        for _ in range(min(rng.randint(3, 12), len(ingredient_ids))):
+            index = skewed(rng, 0, len(ingredient_ids), alpha=2)
+            while index in picked:
+                index = rng.randrange(len(ingredient_ids))
+            picked.add(index)
+            ingredients.append((
+                recipe_id,
+                ingredient_ids[index],
+                rng.randint(settings.MIN_VALUE, 1000),
+            ))
+        for tag_id in rng.sample(tag_ids,
+                                 rng.randint(1, min(3, len(tag_ids)))):
+            tags.append((recipe_id, tag_id))
+    return recipes, ingredients, tags
+
+
+def generate_links(task):
+    (seed, kind, owners, targets, quota, with_date, now, naive) = task
+    rng = random.Random(f'{seed}:{kind}:{owners[0]}')
+    weights = [rng.paretovariate(1.2) for _ in range(*owners)]
+    total_weight = sum(weights)
+    limit = (targets[1] - targets[0]) // 2
+    rows = []
+    for owner_id, weight in zip(range(*owners), weights):
+        count = min(limit, round(quota * weight / total_weight))
+        picked = set()
+        while len(picked) < count:
+            target_id = skewed(rng, *targets, alpha=2)
+            if target_id != owner_id:
+                picked.add(target_id)
+        for target_id in picked:
+            if with_date:
+                added = now - TIME_SPAN * rng.random()
+                rows.append((owner_id, target_id,
+                             format_datetime(added, naive)))
+            else:
+                rows.append((owner_id, target_id))
+    return rows
+
+
+def format_datetime(value, naive):
+    if naive:
+        return str(timezone.make_naive(value, timezone.utc))
+    return str(value)
+
+
+class Command(BaseCommand):
+    help = ('Generate a large synthetic dataset of users, recipes, follows, '
+            'favorites and shopping carts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--follows', type=int, default=50_000)
+        parser.add_argument('--favorites', type=int, default=100_000)
+        parser.add_argument('--carts', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.seed = options['seed']
+        self.now = timezone.now()
+        self.naive = connection.vendor != 'postgresql'
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError('Load ingredients and tags first.')
+        if options['users'] < 2 or options['recipes'] < 2:
+            raise CommandError('At least two users and recipes are needed.')
+
+        first_user = self._next_id(User)
+        first_recipe = self._next_id(Recipe)
+        users = (first_user, first_user + options['users'])
+        recipes = (first_recipe, first_recipe + options['recipes'])
+
+        connections.close_all()
+        pool = Pool(options['workers']) if options['workers'] > 1 else None
+        try:
+            self.map = pool.imap if pool else map
+            self._generate_users(users)
+            self._generate_recipes(recipes, users, ingredient_ids, tag_ids)
+            self._generate_links(Follow, 'user', 'following',
+                                 users, users, options['follows'])
+            self._generate_links(Favorite, 'owner', 'recipe',
+                                 users, recipes, options['favorites'])
+            self._generate_links(ShoppingCart, 'owner', 'recipe',
+                                 users, recipes, options['carts'])
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                         (User, Recipe)):
+                cursor.execute(sql)
+        self.stdout.write(self.style.SUCCESS('Dataset is generated.'))
+
+    def _generate_users(self, users):
+        tasks = (
+            (self.seed, first_id, min(self.batch_size, users[1] - first_id))
+            for first_id in range(users[0], users[1], self.batch_size)
+        )
+        writer = self._writer(
+            User, ('id', 'username', 'email', 'first_name', 'last_name'),
+            password=make_password(PASSWORD),
+        )
+        self._run('users', writer, self.map(generate_users, tasks))
+
+    def _generate_recipes(self, recipes, users, ingredient_ids, tag_ids):
+        tasks = (
+            (self.seed, first_id, min(self.batch_size, recipes[1] - first_id),
+             users, ingredient_ids, tag_ids, self.now, self.naive)
+            for first_id in range(recipes[0], recipes[1], self.batch_size)
+        )
+        recipe_writer = self._writer(
+            Recipe,
+            ('id', 'author', 'name', 'cooking_time', 'pub_date', 'text'),
+        )
+        ingredient_writer = self._writer(
+            RecipeIngredient, ('recipe', 'ingredient', 'amount'))
+        tag_writer = self._writer(Recipe.tags.through, ('recipe', 'tag'))
+
+        def write(batch):
+            recipe_rows, ingredient_rows, tag_rows = batch
+            return (recipe_writer(recipe_rows)
+                    + ingredient_writer(ingredient_rows)
+                    + tag_writer(tag_rows))
+
+        self._run('recipes', write, self.map(generate_recipes, tasks))
+
+    def _generate_links(self, model, owner, target, owners, targets, total):
+        if not total:
+            return
+        owners_count = owners[1] - owners[0]
+        step = max(1, self.batch_size * owners_count // total)
+        with_date = any(field.name == 'pub_date'
+                        for field in model._meta.concrete_fields)
+        tasks = (
+            (self.seed, model._meta.model_name,
+             (first_id, min(first_id + step, owners[1])), targets,
+             total * (min(first_id + step, owners[1]) - first_id)
+             // owners_count,
+             with_date, self.now, self.naive)
+            for first_id in range(owners[0], owners[1], step)
+        )
+        fields = (owner, target, 'pub_date') if with_date else (owner, target)
+        writer = self._writer(model, fields)
+        self._run(model._meta.verbose_name_plural.lower(), writer,
+                  self.map(generate_links, tasks))
+
+    def _run(self, label, write, batches):
+        started = time.monotonic()
+        total = 0
+        for batch in batches:
+            with transaction.atomic():
+                total += write(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{label}: {total} rows, {total / elapsed:.0f} rows/s',
+                ending='\r',
+            )
+        self.stdout.write('')
+
+    def _writer(self, model, field_names, **constants):
+        """Build a function writing generated rows into the model table.
+
+        Every concrete column that is not generated gets a single value
+        computed once: an explicit constant, ``now`` for automatic dates,
+        the field default or NULL.
+        """
+        opts = model._meta
+        generated = [opts.get_field(name) for name in field_names]
+        fixed = []
+        for field in opts.concrete_fields:
+            if field in generated or field.primary_key:
+                continue
+            if field.name in constants:
+                value = constants[field.name]
+            elif getattr(field, 'auto_now', False) or getattr(
+                    field, 'auto_now_add', False):
+                value = self.now
+            elif field.has_default():
+                value = field.get_default()
+            elif field.null:
+                value = None
+            else:
+                raise CommandError(
+                    f'No value for {opts.label}.{field.name}.')
+            fixed.append((field, field.get_db_prep_save(value, connection)))
+        columns = [field.column for field in generated]
+        columns += [field.column for field, _ in fixed]
+        fixed_values = tuple(value for _, value in fixed)
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        column_list = ', '.join(quote(column) for column in columns)
+
+        def write(rows):
+            if not rows:
+                return 0
+            rows = [row + fixed_values for row in rows]
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(rows)
+                    buffer.seek(0)
+                    cursor.copy_expert(
+                        f'COPY {table} ({column_list}) '
+                        f'FROM STDIN WITH (FORMAT csv)',
+                        buffer,
+                    )
+                else:
+                    placeholders = ', '.join(['%s'] * len(columns))
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({column_list}) '
+                        f'VALUES ({placeholders})',
+                        rows,
+                    )
+            return len(rows)
+
+        return write
+
+    @staticmethod
+    def _next_id(model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
@@ -0,0 +1,27 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+
+from recipes.images import update_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build resized copies of recipe images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='rebuild the variants of every image')
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image__isnull=True).exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        rows = recipes.values_list('pk', 'image').iterator()
+        with ThreadPoolExecutor(options['workers']) as executor:
+            for _ in executor.map(lambda row: update_image_variants(*row),
+                                  rows):
+                pass
+        self.stdout.write(self.style.SUCCESS('Image variants are built.'))
@@ -0,0 +1,58 @@
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from recipes.importers import RecipeImporter, read_bundle
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Create recipes from a JSON Lines bundle. Invalid records are '
+            'reported on stderr; with --checkpoint, a rerun resumes after '
+            'the last written batch.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines bundle')
+        parser.add_argument('--author', required=True,
+                            help='email of the author of the recipes')
+        parser.add_argument('--checkpoint',
+                            help='file keeping the last written line')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.RECIPE_IMPORT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='processes decoding the images')
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(email=options['author']).first()
+        if author is None:
+            raise CommandError(f'No user with email {options["author"]}.')
+        checkpoint = (Path(options['checkpoint']) if options['checkpoint']
+                      else None)
+        after = (int(checkpoint.read_text())
+                 if checkpoint and checkpoint.exists() else 0)
+        created = failed = 0
+        importer = RecipeImporter(author, options['batch_size'],
+                                  options['workers'])
+        with open(options['path'], encoding='utf-8-sig') as file, importer:
+            for result in importer.load(read_bundle(file, after)):
+                created += len(result.created)
+                failed += len(result.errors)
+                for error in result.errors:
+                    self.stderr.write(json.dumps(error._asdict(),
+                                                 ensure_ascii=False))
+                if checkpoint:
+                    self._save_checkpoint(checkpoint, result.line)
+                self.stdout.write(f'line {result.line}: {created} created, '
+                                  f'{failed} failed')
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} recipes are imported, {failed} records failed.'
+        ))
+
+    @staticmethod
+    def _save_checkpoint(checkpoint: Path, line: int) -> None:
+        temporary = checkpoint.with_name(checkpoint.name + '.tmp')
+        temporary.write_text(str(line))
+        os.replace(temporary, checkpoint)
@@ -1,40 +1,90 @@
-import json
+import os
+import time
+from itertools import chain
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from recipes.models import Ingredient, Tag
-from users.models import User
+from recipes.loaders import (LOAD_SPECS, BulkUpsertLoader, guess_spec_name,
+                             read_csv, read_json_array, read_json_lines)
+
+FORMATS = {
+    '.json': 'json',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.csv': 'csv',
+}
 
 
 class Command(BaseCommand):
+    help = ('Load tags, ingredients or users from a JSON, JSON Lines or CSV '
+            'file. Existing rows are updated, so loading is idempotent.')
 
     def add_arguments(self, parser):
         parser.add_argument("--path", type=str, help="file path")
+        parser.add_argument(
+            "--model", choices=tuple(LOAD_SPECS),
+            help="kind of records, guessed from the file when omitted",
+        )
+        parser.add_argument(
+            "--format", choices=sorted(set(FORMATS.values())),
+            help="file format, guessed from the extension when omitted",
+        )
+        parser.add_argument(
+            "--fields", type=str,
+            help="comma-separated CSV columns, model fields by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="processes hashing user passwords",
+        )
 
     def handle(self, *args, **options):
-        file_path = options["path"]
-
-        with open(file_path, encoding='utf-8') as f:
-            jsondata = json.load(f)
-            if 'color' in jsondata[0]:
-                for line in jsondata:
-                    Tag.objects.create(
-                        name=line['name'],
-                        color=line['color'],
-                        slug=line['slug'],
-                    )
-            elif 'measurement_unit' in jsondata[0]:
-                for line in jsondata:
-                    Ingredient.objects.create(
-                        name=line['name'],
-                        measurement_unit=line['measurement_unit']
-                    )
-            elif 'email' in jsondata[0]:
-                for line in jsondata:
-                    User.objects.create(
-                        email=line['email'],
-                        username=line['username'],
-                        first_name=line['first_name'],
-                        last_name=line['last_name'],
-                        password=line['password'],
-                    )
+        path = Path(options["path"])
+        file_format = options["format"] or FORMATS.get(path.suffix.lower())
+        if file_format is None:
+            raise CommandError(f'Unknown file format: {path.name}')
+        spec_name = options["model"]
+        if spec_name is None and path.stem in LOAD_SPECS:
+            spec_name = path.stem
+
+        with open(path, encoding='utf-8-sig', newline='') as file:
+            if file_format == 'csv':
+                if spec_name is None:
+                    raise CommandError('Pass --model for CSV files.')
+                fields = (options["fields"].split(',') if options["fields"]
+                          else LOAD_SPECS[spec_name].fields)
+                records = read_csv(file, fields)
+            elif file_format == 'jsonl':
+                records = read_json_lines(file)
+            else:
+                records = read_json_array(file)
+
+            if spec_name is None:
+                first = next(records, None)
+                if first is None:
+                    return
+                spec_name = guess_spec_name(first)
+                records = chain((first,), records)
+
+            with BulkUpsertLoader(LOAD_SPECS[spec_name],
+                                  options["batch_size"],
+                                  options["workers"]) as loader:
+                self._load(spec_name, loader, records)
+
+    def _load(self, spec_name, loader, records):
+        started = time.monotonic()
+        rows = created = updated = 0
+        for result in loader.load(records):
+            rows += result.rows
+            created += result.created
+            updated += result.updated
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{spec_name}: {rows} rows, {created} created, '
+                f'{updated} updated, {rate:.0f} rows/s'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{spec_name.capitalize()} are loaded.'
+        ))
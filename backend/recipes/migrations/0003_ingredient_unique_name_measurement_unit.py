@@ -0,0 +1,47 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:09
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for group in duplicates:
+        extra_ids = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep']).values_list('id', flat=True)
+        for extra_id in list(extra_ids):
+            taken = RecipeIngredient.objects.filter(
+                ingredient_id=group['keep']
+            ).values('recipe_id')
+            RecipeIngredient.objects.filter(
+                ingredient_id=extra_id, recipe_id__in=taken
+            ).delete()
+            RecipeIngredient.objects.filter(
+                ingredient_id=extra_id
+            ).update(ingredient_id=group['keep'])
+            Ingredient.objects.filter(id=extra_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.18 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+SEED_BATCH_SIZE = 10000
+
+
+def log_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeChange = apps.get_model('recipes', 'RecipeChange')
+    recipe_ids = Recipe.objects.order_by('pub_date', 'id').values_list(
+        'id', flat=True
+    ).iterator(chunk_size=SEED_BATCH_SIZE)
+    RecipeChange.objects.bulk_create(
+        (RecipeChange(recipe_id=recipe_id, action='upsert')
+         for recipe_id in recipe_ids),
+        batch_size=SEED_BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(db_index=True, verbose_name='Recipe id')),
+                ('action', models.CharField(choices=[('upsert', 'Created or changed'), ('delete', 'Deleted')], max_length=6, verbose_name='Action')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Date and time of the change')),
+            ],
+            options={
+                'verbose_name': 'Recipe change',
+                'verbose_name_plural': 'Recipe changes',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.RunPython(log_existing_recipes,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from foodgram.db.operations import AddPrefixSearchIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0007_recipechange'),
+    ]
+
+    operations = [
+        AddPrefixSearchIndex('recipe', 'name'),
+        AddPrefixSearchIndex('ingredient', 'name'),
+    ]
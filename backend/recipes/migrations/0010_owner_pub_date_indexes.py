@@ -0,0 +1,21 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['owner', '-pub_date', 'recipe'], name='favorite_owner_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['owner', '-pub_date', 'recipe'], name='cart_owner_pub_date_idx'),
+        ),
+    ]
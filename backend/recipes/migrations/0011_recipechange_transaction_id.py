@@ -0,0 +1,22 @@
+# Generated by Django 3.2.18 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_owner_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipechange',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Id of the writing transaction'),
+        ),
+        migrations.AddIndex(
+            model_name='recipechange',
+            index=models.Index(fields=['transaction_id', 'id'], name='recipechange_cursor_idx'),
+        ),
+    ]
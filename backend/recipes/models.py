@@ -3,6 +3,9 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from foodgram.db.deletion import SoftDeleteManager
+from recipes.storage import recipe_image_storage
+
 User = get_user_model()
 
 
@@ -23,6 +26,12 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name} {self.measurement_unit}'
@@ -79,6 +88,11 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Date and time of the last change',
+        auto_now=True,
+        db_index=True,
+    )
     text = models.TextField(
         verbose_name='Recipe description',
         blank=False,
@@ -93,10 +107,25 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Image of the recipe',
         upload_to='recipes/images/',
+        storage=recipe_image_storage,
         help_text='Attach a photo of the recipe',
         null=True,
         default=None,
     )
+    image_variants = models.JSONField(
+        verbose_name='Resized copies of the image',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    is_deleted = models.BooleanField(
+        verbose_name='Deleted, waiting to be purged',
+        default=False,
+        editable=False,
+    )
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -166,6 +195,10 @@ class ShoppingCart(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Shopping cart'
         verbose_name_plural = 'Shopping carts'
+        indexes = (
+            models.Index(fields=('owner', '-pub_date', 'recipe'),
+                         name='cart_owner_pub_date_idx'),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('recipe', 'owner'),
@@ -203,6 +236,10 @@ class Favorite(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Favorite'
         verbose_name_plural = 'Favorites'
+        indexes = (
+            models.Index(fields=('owner', '-pub_date', 'recipe'),
+                         name='favorite_owner_pub_date_idx'),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('recipe', 'owner'),
@@ -212,3 +249,50 @@ class Favorite(models.Model):
 
     def __str__(self) -> str:
         return f'{self.owner} -> {self.recipe}'
+
+
+class RecipeChange(models.Model):
+    """A change-log entry: the recipe was created, changed or deleted.
+
+    Entries are read in the order of ``transaction_id``, then of id,
+    which make up the sync cursor. ``recipe_id`` is not a foreign key,
+    so entries of deleted recipes stay as tombstones.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTIONS = (
+        (UPSERT, 'Created or changed'),
+        (DELETE, 'Deleted'),
+    )
+
+    recipe_id = models.BigIntegerField(
+        verbose_name='Recipe id',
+        db_index=True,
+    )
+    action = models.CharField(
+        verbose_name='Action',
+        max_length=6,
+        choices=ACTIONS,
+    )
+    changed_at = models.DateTimeField(
+        verbose_name='Date and time of the change',
+        auto_now_add=True,
+        db_index=True,
+    )
+    transaction_id = models.BigIntegerField(
+        verbose_name='Id of the writing transaction',
+        default=0,
+        editable=False,
+    )
+
+    class Meta:
+        ordering = ('id',)
+        indexes = (
+            models.Index(fields=('transaction_id', 'id'),
+                         name='recipechange_cursor_idx'),
+        )
+        verbose_name = 'Recipe change'
+        verbose_name_plural = 'Recipe changes'
+
+    def __str__(self) -> str:
+        return f'{self.action} {self.recipe_id}'
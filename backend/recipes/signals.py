@@ -0,0 +1,51 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.changes import log_recipe_changes, schedule_tag_changes
+from recipes.models import Recipe, RecipeChange, RecipeIngredient, Tag
+
+
+@receiver(post_save, sender=Recipe)
+def log_saved_recipe(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_recipe_changes((instance.pk,))
+
+
+@receiver(post_delete, sender=Recipe)
+def log_deleted_recipe(sender, instance, **kwargs):
+    log_recipe_changes((instance.pk,), RecipeChange.DELETE)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def log_recipe_ingredient(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_recipe_changes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def log_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        log_recipe_changes((instance.pk,))
+    elif action == 'pre_clear':
+        log_recipe_changes(instance.recipes.values_list('pk', flat=True))
+    else:
+        log_recipe_changes(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def log_saved_tag_recipes(sender, instance, created=False, raw=False,
+                          **kwargs):
+    if not created and not raw:
+        schedule_tag_changes(tag_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+def log_deleted_tag_recipes(sender, instance, **kwargs):
+    """The recipes lose the tag with it, so their ids are kept for the job."""
+    recipe_ids = list(instance.recipes.values_list('pk', flat=True))
+    if recipe_ids:
+        schedule_tag_changes(recipe_ids=recipe_ids)
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Name files by the SHA-256 of their content.
+
+    ``recipes/images/x.jpg`` is stored as ``recipes/images/ab/abcd….jpg``,
+    so a duplicate upload resolves to the already stored file and a name
+    never changes its content, which lets clients cache files forever.
+    Unreferenced files are removed by the ``collect_media_garbage``
+    command; saving a duplicate touches the stored file, so the command
+    treats it as new and does not delete it while its new reference is
+    being committed.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        name = posixpath.join(directory, hexdigest[:2],
+                              f'{hexdigest}{extension}')
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
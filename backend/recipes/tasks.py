@@ -0,0 +1,46 @@
+from typing import List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from jobs.queue import task
+from recipes.changes import LOG_TAG_CHANGES_TASK, log_tag_changes
+from recipes.deletion import PURGE_RECIPES_TASK, purge_recipes
+from recipes.helpers import ShoppingCartToPDF
+from recipes.images import IMAGE_VARIANTS_TASK, save_image_variants
+from recipes.models import Recipe
+
+SHOPPING_CART_PDF_TASK = 'recipes.shopping_cart_pdf'
+
+User = get_user_model()
+
+
+@task(IMAGE_VARIANTS_TASK)
+def image_variants(recipe_id: int, name: str) -> None:
+    save_image_variants(recipe_id, name)
+
+
+@task(SHOPPING_CART_PDF_TASK)
+def shopping_cart_pdf(user_id: int) -> dict:
+    """Render the shopping list of the user into a file of the job."""
+    pdf = ShoppingCartToPDF.render(User.objects.get(pk=user_id))
+    name = default_storage.save(
+        f'{settings.JOB_RESULTS_DIR}/{uuid4().hex}.pdf', ContentFile(pdf)
+    )
+    return {'file': name, 'filename': ShoppingCartToPDF.FILENAME,
+            'content_type': 'application/pdf'}
+
+
+@task(LOG_TAG_CHANGES_TASK)
+def log_tag_recipe_changes(tag_id: Optional[int] = None,
+                           recipe_ids: Optional[List[int]] = None) -> int:
+    return log_tag_changes(tag_id, recipe_ids)
+
+
+@task(PURGE_RECIPES_TASK)
+def purge_hidden_recipes(recipe_ids: List[int]) -> None:
+    purge_recipes(Recipe.all_objects.filter(pk__in=recipe_ids,
+                                            is_deleted=True))
@@ -1,7 +1,25 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
+from pathlib import Path
 
-from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient
-from users.models import User
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from recipes.images import update_image_variants
+from recipes.loaders import (LOAD_SPECS, BatchResult, BulkUpsertLoader,
+                             hash_password)
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.storage import recipe_image_storage
+from users.models import Follow, User
 
 
 class RecipeModelTestCase(TestCase):
@@ -30,3 +48,234 @@ class RecipeModelTestCase(TestCase):
         Favorite.objects.create(recipe=self.recipe, user=self.user)
         qs = Recipe.objects.add_user_annotations(user_id=self.user.id)
         self.assertTrue(qs.values()[0]['is_favorite'])
+
+
+class JsonToDbCommandTestCase(TestCase):
+    DATA_DIR = Path(__file__).resolve().parent / 'data'
+
+    def test_loading_twice_is_idempotent(self):
+        for _ in range(2):
+            call_command('json_to_db', path=self.DATA_DIR / 'tags.json',
+                         stdout=StringIO())
+            call_command('json_to_db',
+                         path=self.DATA_DIR / 'ingredients.csv',
+                         model='ingredients', stdout=StringIO())
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(Ingredient.objects.count(), 2188)
+
+    def test_user_passwords_are_hashed(self):
+        call_command('json_to_db', path=self.DATA_DIR / 'users.json',
+                     stdout=StringIO())
+        user = User.objects.get(email='danil@mail.ru')
+        self.assertTrue(user.check_password('danil123password'))
+
+    def test_keys_repeated_in_the_next_batch_are_updated(self):
+        records = [
+            {'name': 'Lunch', 'color': '#49B64E', 'slug': 'lunch'},
+            {'name': 'Dinner', 'color': '#8775D2', 'slug': 'dinner'},
+            {'name': 'Late lunch', 'color': '#E26C2D', 'slug': 'lunch'},
+        ]
+        with BulkUpsertLoader(LOAD_SPECS['tags'], batch_size=2) as loader:
+            results = list(loader.load(records))
+        self.assertEqual(results, [BatchResult(2, 2, 0),
+                                   BatchResult(1, 0, 1)])
+        self.assertEqual(Tag.objects.get(slug='lunch').name, 'Late lunch')
+
+    def test_hashed_passwords_are_kept(self):
+        hashed = make_password('secret')
+        record = hash_password({'password': hashed})
+        self.assertEqual(record['password'], hashed)
+        record = hash_password({'password': 'secret'})
+        self.assertTrue(check_password('secret', record['password']))
+
+
+class GenerateDatasetCommandTestCase(TransactionTestCase):
+
+    def setUp(self) -> None:
+        for name in ('salt', 'flour', 'milk', 'eggs'):
+            Ingredient.objects.create(name=name, measurement_unit='g')
+        for slug in ('breakfast', 'lunch'):
+            Tag.objects.create(name=slug, color=f'#{len(slug):06}', slug=slug)
+
+    def _generate(self):
+        call_command('generate_dataset', users=20, recipes=50, follows=30,
+                     favorites=60, carts=40, batch_size=8, workers=1,
+                     seed=7, stdout=StringIO())
+        return {
+            'users': list(User.objects.order_by('id').values_list(
+                'id', 'username', 'first_name', 'last_name'
+            )),
+            'recipes': list(Recipe.objects.order_by('id').values_list(
+                'id', 'author', 'name', 'cooking_time', 'text'
+            )),
+            'ingredients': list(RecipeIngredient.objects.order_by(
+                'recipe', 'ingredient'
+            ).values_list('recipe', 'ingredient', 'amount')),
+            'tags': list(Recipe.tags.through.objects.order_by(
+                'recipe', 'tag'
+            ).values_list('recipe', 'tag')),
+            'follows': list(Follow.objects.order_by(
+                'user', 'following'
+            ).values_list('user', 'following')),
+            'favorites': list(Favorite.objects.order_by(
+                'owner', 'recipe'
+            ).values_list('owner', 'recipe')),
+            'carts': list(ShoppingCart.objects.order_by(
+                'owner', 'recipe'
+            ).values_list('owner', 'recipe')),
+        }
+
+    def test_generates_requested_rows(self):
+        data = self._generate()
+        self.assertEqual(len(data['users']), 20)
+        self.assertEqual(len(data['recipes']), 50)
+        self.assertTrue(data['ingredients'])
+        self.assertTrue(data['tags'])
+        for kind, requested in (('follows', 30), ('favorites', 60),
+                                ('carts', 40)):
+            with self.subTest(kind=kind):
+                self.assertAlmostEqual(len(data[kind]), requested,
+                                       delta=requested // 5)
+        self.assertTrue(all(user != following
+                            for user, following in data['follows']))
+
+    def test_same_seed_gives_same_data(self):
+        first = self._generate()
+        User.objects.all().delete()
+        self.assertEqual(self._generate(), first)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageVariantsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        buffer = BytesIO()
+        Image.new('RGBA', (2000, 1000), 'red').save(buffer, 'PNG')
+        self.image_content = buffer.getvalue()
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Borsch', text='Cook it',
+            cooking_time=60,
+            image=SimpleUploadedFile('borsch.png', self.image_content),
+        )
+
+    def test_variants_are_resized(self):
+        update_image_variants(self.recipe.pk, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), set(settings.RECIPE_IMAGE_SIZES))
+        with recipe_image_storage.open(variants['card']['jpeg']) as file:
+            self.assertEqual(Image.open(file).size, (480, 240))
+
+    def test_duplicate_uploads_share_a_file(self):
+        duplicate = Recipe.objects.create(
+            author=self.user, name='Borsch again', text='Cook it',
+            cooking_time=60,
+            image=SimpleUploadedFile('copy.png', self.image_content),
+        )
+        self.assertEqual(duplicate.image.name, self.recipe.image.name)
+
+    def test_duplicates_renew_the_grace_period(self):
+        orphan = recipe_image_storage.save('recipes/images/orphan.png',
+                                           ContentFile(b'orphan'))
+        path = recipe_image_storage.path(orphan)
+        os.utime(path, (0, 0))
+        recipe_image_storage.save('recipes/images/again.png',
+                                  ContentFile(b'orphan'))
+        call_command('collect_media_garbage', grace=60, stdout=StringIO())
+        self.assertTrue(recipe_image_storage.exists(orphan))
+
+    def test_unreferenced_files_are_collected(self):
+        update_image_variants(self.recipe.pk, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        kept = self.recipe.image_variants['card']['jpeg']
+        orphan = recipe_image_storage.save('recipes/images/orphan.png',
+                                           ContentFile(b'orphan'))
+        call_command('collect_media_garbage', grace=-60, stdout=StringIO())
+        self.assertFalse(recipe_image_storage.exists(orphan))
+        self.assertTrue(recipe_image_storage.exists(kept))
+        self.assertTrue(recipe_image_storage.exists(self.recipe.image.name))
+
+
+class RecipeAdminTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@mail.ru', password='secret'
+        )
+        self.cook = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        self.recipe = Recipe.objects.create(author=self.cook, name='Salad',
+                                            text='Mix', cooking_time=5)
+        Recipe.objects.create(author=self.admin, name='Soup', text='Boil',
+                              cooking_time=30)
+        Favorite.objects.create(owner=self.admin, recipe=self.recipe)
+        self.client.force_login(self.admin)
+
+    def test_changelist_filters_by_author(self):
+        response = self.client.get('/admin/recipes/recipe/',
+                                   {'author__exact': self.cook.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.recipe])
+        self.assertEqual(response.context['cl'].result_list[0]
+                         .favorites_count, 1)
+        self.assertContains(response, 'admin-autocomplete')
+
+    def test_prefix_search(self):
+        response = self.client.get('/admin/recipes/favorite/',
+                                   {'q': 'sal'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get('/admin/recipes/favorite/',
+                                   {'q': 'alad'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImportRecipesCommandTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username='cook',
+                                             email='cook@mail.ru')
+        Tag.objects.create(name='Lunch', color='#49B64E', slug='lunch')
+        self.salt = Ingredient.objects.create(name='salt',
+                                              measurement_unit='g')
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'red').save(buffer, 'PNG')
+        image = base64.b64encode(buffer.getvalue()).decode()
+        records = [
+            {'name': f'Soup {number}', 'text': 'Boil', 'cooking_time': 30,
+             'tags': ['lunch'], 'image': f'data:image/png;base64,{image}',
+             'ingredients': [{'name': 'salt', 'measurement_unit': 'g',
+                              'amount': number + 1}]}
+            for number in range(3)
+        ]
+        records[1]['ingredients'][0]['measurement_unit'] = 'kg'
+        directory = Path(tempfile.mkdtemp())
+        self.bundle = directory / 'recipes.jsonl'
+        self.bundle.write_text(
+            '\n'.join(json.dumps(record) for record in records)
+        )
+        self.checkpoint = directory / 'checkpoint'
+
+    def _import(self):
+        stderr = StringIO()
+        call_command('import_recipes', self.bundle, author='cook@mail.ru',
+                     checkpoint=self.checkpoint, batch_size=2, workers=1,
+                     stdout=StringIO(), stderr=stderr)
+        return [json.loads(line) for line in stderr.getvalue().splitlines()]
+
+    def test_import_with_errors_and_checkpoint(self):
+        errors = self._import()
+        self.assertEqual([error['line'] for error in errors], [2])
+        self.assertIn('ingredients', errors[0]['errors'])
+        recipes = Recipe.objects.order_by('name')
+        self.assertEqual([recipe.name for recipe in recipes],
+                         ['Soup 0', 'Soup 2'])
+        self.assertEqual(recipes[1].recipe_ingredient.get().amount, 3)
+        self.assertEqual(recipes[1].tags.get().slug, 'lunch')
+        self.assertTrue(recipe_image_storage.exists(recipes[1].image.name))
+        self.assertEqual(self.checkpoint.read_text(), '3')
+        self._import()
+        self.assertEqual(Recipe.objects.count(), 2)
@@ -1,19 +1,35 @@
-from django.contrib.admin import ModelAdmin, register
+from django.contrib import messages
+from django.contrib.admin import action, register
 
+from foodgram.admin import AutocompleteFilter, ScalableModelAdmin
+
+from .deletion import soft_delete_user
 from .models import Follow, User
 
 
 @register(User)
-class UserAdmin(ModelAdmin):
-    search_fields = ('email', 'username')
+class UserAdmin(ScalableModelAdmin):
+    search_fields = ('^email', '^username', '^first_name', '^last_name')
     list_display = ('email', 'first_name', 'last_name')
-    list_filter = ('email', 'username')
-    empty_value_display = '-empty-'
+    list_filter = ('is_staff', 'is_active')
+    actions = ('delete_in_background',)
+
+    @action(description='Delete in the background',
+            permissions=('delete',))
+    def delete_in_background(self, request, queryset):
+        """Hide the users now and queue the deletion of their rows."""
+        users = list(queryset.exclude(pk=request.user.pk))
+        for user in users:
+            soft_delete_user(user, owner=request.user)
+        self.message_user(request, f'{len(users)} users will be deleted.',
+                          messages.SUCCESS)
 
 
 @register(Follow)
-class FollowAdmin(ModelAdmin):
-    search_fields = ('user', 'following')
+class FollowAdmin(ScalableModelAdmin):
+    search_fields = ('^user__username', '^following__username')
     list_display = ('pk', 'user', 'following')
-    list_filter = ('user', 'following')
-    empty_value_display = '-empty-'
+    list_filter = (('user', AutocompleteFilter),
+                   ('following', AutocompleteFilter))
+    list_select_related = ('user', 'following')
+    autocomplete_fields = ('user', 'following')
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from foodgram.db.deletion import delete_in_batches
+from jobs.models import Job
+from jobs.queue import MAINTENANCE, enqueue
+from recipes.deletion import hide_recipes, purge_recipes
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+DELETE_USER_TASK = 'users.delete_user'
+
+User = get_user_model()
+
+
+def soft_delete_user(user, owner=None) -> Job:
+    """Hide and deactivate the user and their recipes at once.
+
+    The rows are removed by a job, see ``purge_user``.
+    """
+    user.is_deleted = True
+    user.is_active = False
+    user.save(update_fields=('is_deleted', 'is_active'))
+    hide_recipes(Recipe.objects.filter(author=user))
+    return enqueue(DELETE_USER_TASK, {'user_id': user.pk}, owner=owner,
+                   priority=MAINTENANCE)
+
+
+def purge_user(user_id: int) -> None:
+    """Delete a soft-deleted user and their rows in batches.
+
+    Their recipes go first, then their favorites, shopping cart and
+    follows, and last the user with the few rows left to cascade.
+    """
+    purge_recipes(Recipe.all_objects.filter(author_id=user_id))
+    for queryset in (Favorite.objects.filter(owner_id=user_id),
+                     ShoppingCart.objects.filter(owner_id=user_id),
+                     Follow.objects.filter(user_id=user_id),
+                     Follow.objects.filter(following_id=user_id)):
+        delete_in_batches(queryset, settings.PURGE_BATCH_SIZE)
+    User.all_objects.filter(pk=user_id).delete()
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Case, IntegerField, Q, Value, When
+from django_filters import rest_framework
+
+User = get_user_model()
+
+SEARCH_FIELDS = ('username', 'first_name', 'last_name')
+SEARCH_RANK = 'search_rank'
+# Shorter terms are matched by prefix only, as trigrams cannot serve them.
+MIN_SUBSTRING_SEARCH_LENGTH = 3
+
+
+def _any_field(lookup: str, value: str) -> Q:
+    query = Q()
+    for field in SEARCH_FIELDS:
+        query |= Q(**{f'{field}__{lookup}': value})
+    return query
+
+
+class UserFilter(rest_framework.FilterSet):
+    """``search`` users by username or name.
+
+    Exact usernames rank first, then prefix matches, then the other
+    matches, in order of ``SEARCH_RANK``. Every lookup is served by the
+    ``UPPER(...)`` prefix and trigram indexes of the fields.
+    """
+    search = rest_framework.CharFilter(method='filter_search')
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        prefix = _any_field('istartswith', value)
+        matches = prefix
+        if len(value) >= MIN_SUBSTRING_SEARCH_LENGTH:
+            matches |= _any_field('icontains', value)
+        return queryset.filter(matches).annotate(**{SEARCH_RANK: Case(
+            When(username__iexact=value, then=Value(settings.ONE)),
+            When(prefix, then=Value(settings.TWO)),
+            default=Value(settings.THREE),
+            output_field=IntegerField(),
+        )})
+
+    class Meta:
+        model = User
+        fields = ('search',)
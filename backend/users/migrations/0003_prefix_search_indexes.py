@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from foodgram.db.operations import AddPrefixSearchIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_user_updated_at'),
+    ]
+
+    operations = [
+        AddPrefixSearchIndex('user', 'email'),
+        AddPrefixSearchIndex('user', 'username'),
+    ]
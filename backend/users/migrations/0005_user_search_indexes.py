@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from foodgram.db.operations import AddPrefixSearchIndex, AddTrigramSearchIndex
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('users', '0004_user_is_deleted'),
+    ]
+
+    operations = [
+        AddPrefixSearchIndex('user', 'first_name'),
+        AddPrefixSearchIndex('user', 'last_name'),
+        AddTrigramSearchIndex('user', 'username'),
+        AddTrigramSearchIndex('user', 'first_name'),
+        AddTrigramSearchIndex('user', 'last_name'),
+    ]
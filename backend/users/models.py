@@ -1,6 +1,13 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as AuthUserManager
 from django.db import models
 
+from foodgram.db.deletion import SoftDeleteManagerMixin
+
+
+class UserManager(SoftDeleteManagerMixin, AuthUserManager):
+    pass
+
 
 class User(AbstractUser):
     email = models.EmailField(
@@ -21,6 +28,18 @@ class User(AbstractUser):
         max_length=50,
         verbose_name="Last name"
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Date and time of the last change',
+        auto_now=True,
+    )
+    is_deleted = models.BooleanField(
+        verbose_name='Deleted, waiting to be purged',
+        default=False,
+        editable=False,
+    )
+
+    objects = UserManager()
+    all_objects = AuthUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -4,6 +4,8 @@ from django.core import exceptions as django_exceptions
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
+from api.sparse import SparseFieldsMixin
+
 User = get_user_model()
 
 
@@ -18,7 +20,7 @@ class UserRegistrationSerializer(UserCreateSerializer):
         )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
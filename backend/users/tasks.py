@@ -0,0 +1,7 @@
+from jobs.queue import task
+from users.deletion import DELETE_USER_TASK, purge_user
+
+
+@task(DELETE_USER_TASK)
+def delete_user(user_id: int) -> None:
+    purge_user(user_id)
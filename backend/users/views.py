@@ -1,13 +1,22 @@
+from math import ceil
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Exists, OuterRef, Subquery
+from django_filters import rest_framework
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from api.limit import PaginationLimit
+from api.conditional import ConditionalGetMixin
+from api.limit import ApproximateCountPagination, UserSearchPagination
 from api.mixins import CreateListRetrieveModelViewSet
 from api.serializers import SubscribeSerializer
+from api.sparse import SparseFieldsViewMixin
+from api.throttling import AdmissionControlMixin
+from users.filters import UserFilter
 from users.helpers import SubscribeCreateDelete
 from users.models import Follow
 from users.serializers import (PasswordSerializer, UserRegistrationSerializer,
@@ -16,32 +25,76 @@ from users.serializers import (PasswordSerializer, UserRegistrationSerializer,
 User = get_user_model()
 
 
-class UserViewSet(CreateListRetrieveModelViewSet):
+class UserViewSet(AdmissionControlMixin, ConditionalGetMixin,
+                  SparseFieldsViewMixin, CreateListRetrieveModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    pagination_class = PaginationLimit
+    pagination_class = ApproximateCountPagination
+    filter_backends = (rest_framework.DjangoFilterBackend,)
+    filterset_class = UserFilter
     lookup_url_kwarg = 'user_id'
+    sparse_actions = ('list', 'retrieve', 'me', 'subscriptions')
+    throttle_weights = {'create': 5, 'subscriptions': 2}
+    heavy_actions = ('subscriptions',)
 
     def get_queryset(self):
         user = self.request.user
         queryset = super().get_queryset()
         if user.is_anonymous:
             return queryset
-        if self.action in ('retrieve', 'list', 'subscribe',
-                           'subscriptions',):
-            return queryset.annotate(
-                is_subscribed=Exists(Subquery(
-                    Follow.objects.filter(user=user, following=OuterRef('pk'))
-                ))
-            )
+        if (self.action in ('subscribe', 'subscriptions')
+                or self.action in ('retrieve', 'list')
+                and self.wants_field('is_subscribed')):
+            return queryset.annotate(is_subscribed=self.follows(user))
         return queryset
 
+    @property
+    def paginator(self):
+        """Search results are paged by rank, with keyset pagination."""
+        if not hasattr(self, '_paginator'):
+            search = self.request.query_params.get('search', '')
+            if self.action == 'list' and search.strip():
+                self._paginator = UserSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_throttle_weight(self) -> int:
+        """Subscription pages weigh more the more authors they show."""
+        weight = super().get_throttle_weight()
+        if self.action == 'subscriptions':
+            page_size = self.paginator.get_page_size(self.request)
+            weight *= ceil(page_size / settings.DEFAULT_PAGE_PAGINATION)
+        return weight
+
+    @staticmethod
+    def follows(user):
+        return Exists(Subquery(
+            Follow.objects.filter(user=user, following=OuterRef('pk'))
+        ))
+
     def get_permissions(self):
         if self.action in ('retrieve', 'me', 'set_password',
                            'subscriptions', 'subscribe',):
             return IsAuthenticated(),
         return AllowAny(),
 
+    def get_validators(self):
+        if self.action == 'me':
+            return (self.request.user.pk, self.request.user.updated_at), None
+        if self.action == 'retrieve':
+            queryset = super().get_queryset()
+            fields = ['pk', 'updated_at']
+            if self.request.user.is_authenticated:
+                queryset = queryset.annotate(
+                    is_subscribed=self.follows(self.request.user)
+                )
+                fields.append('is_subscribed')
+            user = get_object_or_404(queryset.values_list(*fields),
+                                     pk=self.kwargs['user_id'])
+            return user, user[1]
+        return None
+
     def get_serializer_class(self):
         if self.action == 'create':
             return UserRegistrationSerializer
@@ -62,16 +115,15 @@ class UserViewSet(CreateListRetrieveModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         self.request.user.set_password(serializer.data["new_password"])
-        self.request.user.save()
+        self.request.user.save(update_fields=('password',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=('get',), detail=False)
     def subscriptions(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(
-            self.get_queryset().filter(
-                is_subscribed=True
-            ).prefetch_related('recipes')
-        )
+        queryset = self.get_queryset().filter(is_subscribed=True)
+        if self.wants_field('recipes') or self.wants_field('recipes_count'):
+            queryset = queryset.prefetch_related('recipes')
+        queryset = self.filter_queryset(queryset)
 
         recipes_limit = request.query_params.get('recipes_limit', '')
         if recipes_limit.isdigit():